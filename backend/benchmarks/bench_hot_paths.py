@@ -0,0 +1,282 @@
+"""
+Microbenchmarks dos caminhos quentes do main.py, offline, contra fixtures gravadas:
+cache/season_20*.json e benchmarks/fixtures/season_*.json.gz (classificações do
+FastF1, corridas do Ergast e pilotos do OpenF1; ver record_fixtures.py).
+
+Mede mediana/mínimo por execução, vazão, pico de memória e memória retida
+(tracemalloc) e compara com benchmarks/baseline.json: qualquer caso mais lento ou
+com pico de memória acima da tolerância falha com código de saída 1. Um caso acima
+da tolerância é medido de novo antes de ser acusado.
+
+    cd backend
+    python benchmarks/bench_hot_paths.py [--repeat 20] [--only overview]
+    python benchmarks/bench_hot_paths.py --update-baseline   # grava a nova referência (mediana de 3 medições)
+
+Tempos dependem da máquina: regrave a baseline ao trocar de máquina/Python.
+"""
+import argparse
+import gc
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+BASELINE_PATH = pathlib.Path(__file__).resolve().parent / "baseline.json"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "benchmarks"))
+os.environ.setdefault("SPAN_LOG", "0")
+# o índice SQLite tem casos próprios (store_*); fora deles não entra no write_cache
+os.environ.setdefault("RESULTS_STORE_ENABLED", "0")
+
+import main  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from record_fixtures import FIXTURES_DIR, load_fixture  # noqa: E402
+from utils import cache  # noqa: E402
+from utils.store import ResultsStore  # noqa: E402
+
+# Diferenças abaixo disso são ruído, mesmo que passem da tolerância relativa
+MIN_TIME_DELTA_MS = 0.1
+MIN_PEAK_DELTA_KB = 64.0
+
+
+@dataclass
+class Bench:
+    name: str
+    fn: Callable[[Any], Any]
+    items: int  # unidades processadas por execução (para a vazão)
+    unit: str
+    setup: Callable[[], Any] = lambda: None  # roda fora da medição, antes de cada execução
+    max_repeat: Optional[int] = None
+
+
+def _measure(bench: Bench, repeat: int) -> Dict[str, float]:
+    repeat = min(repeat, bench.max_repeat or repeat)
+    bench.fn(bench.setup())  # aquecimento
+    times = []
+    for _ in range(repeat):
+        state = bench.setup()
+        # como o timeit: sem coletas do GC disparadas pelo lixo do setup no meio da medição
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            bench.fn(state)
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    state = bench.setup()
+    gc.collect()
+    tracemalloc.start()
+    result = bench.fn(state)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    median = statistics.median(times)
+    return {
+        "median_ms": median * 1000,
+        "min_ms": min(times) * 1000,
+        "throughput": bench.items / median if median else 0.0,
+        "peak_kb": peak / 1024,
+        "retained_kb": current / 1024,
+    }
+
+
+def _season_snapshots() -> Dict[int, bytes]:
+    paths = sorted(cache.CACHE_DIR.glob("season_20*.json"))
+    return {int(p.stem.split("_")[1]): p.read_bytes() for p in paths if not p.name.endswith(".meta.json")}
+
+
+def _aggregate(season: int, lookup: Dict[str, Any], rounds: Callable[[], List[Any]], schedule: Dict[str, str]) -> Dict[str, Any]:
+    # mesmo laço de _season_snapshot_stream: rodadas normalizadas -> agregador -> snapshot
+    aggregator = main._SeasonAggregator(season, lookup)
+    for data in rounds():
+        if data is not None:
+            aggregator.add(data)
+    return aggregator.snapshot(schedule)
+
+
+def _fixture_benches(fixture: Dict[str, Any]) -> List[Bench]:
+    season = fixture["season"]
+    lookup = main._latest_by_driver_number(fixture["openf1_drivers"])
+    events = [(item["RoundNumber"], main._event_info(item)) for item in fixture["schedule"]]
+    schedule = {str(rnd): info["date"] for rnd, info in events}
+    classifications = {int(rnd): rows for rnd, rows in fixture["fastf1"].items()}
+    rows = [row for rnd, _ in events for row in classifications.get(rnd, [])]
+
+    def _build_results(_):
+        results = []
+        for row in rows:
+            try:
+                results.append(main._build_race_result(row, lookup))
+            except ValueError:
+                continue
+        return results
+
+    def _fastf1_rounds():
+        return [main._round_from_fastf1(season, rnd, info, classifications.get(rnd, []), lookup) for rnd, info in events]
+
+    def _ergast_rounds():
+        return [main._round_from_ergast(season, race, lookup) for race in fixture["ergast"]]
+
+    return [
+        Bench(f"build_race_result[{season}]", _build_results, len(rows), "linhas"),
+        Bench(f"aggregate_fastf1[{season}]", lambda _: _aggregate(season, lookup, _fastf1_rounds, schedule), len(events), "rodadas"),
+        Bench(f"aggregate_ergast[{season}]", lambda _: _aggregate(season, lookup, _ergast_rounds, schedule), len(fixture["ergast"]), "rodadas"),
+    ]
+
+
+def _snapshot_benches(raw: Dict[int, bytes], tmp_dir: pathlib.Path) -> List[Bench]:
+    seasons = sorted(raw)
+    hydrated = {season: main._hydrate_snapshot(json.loads(raw[season])) for season in seasons}
+    encoded = {season: jsonable_encoder(json.loads(raw[season])) for season in seasons}
+
+    def _hydrate(snapshots):
+        return [main._hydrate_snapshot(snapshot) for snapshot in snapshots]
+
+    def _overview(_):
+        return [main._build_overview(hydrated[season], season) for season in seasons]
+
+    def _write(_):
+        cache.CACHE_DIR, cache.BODIES_DIR = tmp_dir, tmp_dir / "bodies"
+        for season in seasons:
+            cache.write_cache(f"season_{season}", encoded[season])
+
+    def _read(_):
+        cache.CACHE_DIR, cache.BODIES_DIR = tmp_dir, tmp_dir / "bodies"
+        return [cache.read_cache(f"season_{season}") for season in seasons]
+
+    store = ResultsStore(str(tmp_dir / "results.sqlite3"))
+    decoded = {season: json.loads(raw[season]) for season in seasons}
+
+    def _index(_):
+        for season in seasons:
+            store.index_season(season, decoded[season], str(season), slug=main.slugify)
+
+    def _indexed():
+        if not store.seasons():
+            _index(None)
+
+    # consultas estreitas: um piloto / uma equipe por temporada, sem ler o snapshot
+    def _driver_results(_):
+        return [store.driver_results(decoded[season]["drivers"][0]["id"], season) for season in seasons]
+
+    def _team_progression(_):
+        return [store.team_progression(main.slugify(decoded[season]["drivers"][0]["team"]), season) for season in seasons]
+
+    n = len(seasons)
+    return [
+        Bench("hydrate_snapshot", _hydrate, n, "temporadas", setup=lambda: [json.loads(raw[s]) for s in seasons]),
+        Bench("build_overview", _overview, n, "temporadas"),
+        # inclui render + gzip/brotli dos corpos, como no write_cache real
+        Bench(f"write_cache[{cache.codec.name}]", _write, n, "temporadas", max_repeat=5),
+        Bench(f"read_cache[{cache.codec.name}]", _read, n, "temporadas"),
+        Bench("store_index", _index, n, "temporadas", max_repeat=5),
+        Bench("store_driver_results", _driver_results, n, "consultas", setup=_indexed),
+        Bench("store_team_progression", _team_progression, n, "consultas", setup=_indexed),
+    ]
+
+
+def _compare(
+    name: str,
+    result: Dict[str, float],
+    base: Optional[Dict[str, float]],
+    time_tol: float,
+    mem_tol: float,
+) -> List[str]:
+    if not base:
+        return []
+    problems = []
+    expected = base["median_ms"]
+    slower = result["median_ms"] - expected
+    if slower > MIN_TIME_DELTA_MS and result["median_ms"] > expected * (1 + time_tol):
+        problems.append(f"{name}: {result['median_ms']:.3f} ms vs baseline {expected:.3f} ms (+{slower / expected:.0%})")
+    grown = result["peak_kb"] - base["peak_kb"]
+    if grown > MIN_PEAK_DELTA_KB and result["peak_kb"] > base["peak_kb"] * (1 + mem_tol):
+        problems.append(f"{name}: pico {result['peak_kb']:.0f} KB vs baseline {base['peak_kb']:.0f} KB")
+    return problems
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="roda só os casos cujo nome contém este texto")
+    parser.add_argument("--time-tolerance", type=float, default=0.50, help="lentidão relativa aceita (padrão 0.50)")
+    parser.add_argument("--mem-tolerance", type=float, default=0.20, help="aumento relativo de pico aceito (padrão 0.20)")
+    parser.add_argument("--update-baseline", action="store_true", help="grava os resultados em benchmarks/baseline.json")
+    parser.add_argument("--baseline-passes", type=int, default=3, help="medições por caso ao gravar a baseline (padrão 3)")
+    args = parser.parse_args()
+
+    raw = _season_snapshots()
+    fixtures = [load_fixture(p) for p in sorted(FIXTURES_DIR.glob("season_*.json.gz"))]
+    if not raw or not fixtures:
+        sys.exit(f"faltam fixtures: {len(raw)} snapshots em {cache.CACHE_DIR}, {len(fixtures)} em {FIXTURES_DIR}")
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    base_results = baseline.get("results", {})
+    environment = {"python": platform.python_version(), "machine": platform.machine(), "codec": cache.codec.name}
+    if baseline and baseline.get("environment") != environment:
+        print(f"aviso: baseline gravada em {baseline.get('environment')}, rodando em {environment}")
+
+    original_dirs = cache.CACHE_DIR, cache.BODIES_DIR
+    results: Dict[str, Dict[str, float]] = {}
+    problems: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        benches = [b for fixture in fixtures for b in _fixture_benches(fixture)]
+        benches += _snapshot_benches(raw, pathlib.Path(tmp))
+        if args.only:
+            benches = [b for b in benches if args.only in b.name]
+
+        print(f"{'caso':<28}{'itens':>7}{'mediana ms':>12}{'mín ms':>10}{'itens/s':>11}{'pico KB':>10}{'retido KB':>11}{'vs base':>9}")
+        try:
+            for bench in benches:
+                if args.update_baseline:
+                    # referência representativa, não a de um momento de sorte: mediana de várias medições
+                    passes = [_measure(bench, args.repeat) for _ in range(max(1, args.baseline_passes))]
+                    result = {key: statistics.median(p[key] for p in passes) for key in passes[0]}
+                else:
+                    result = _measure(bench, args.repeat)
+                results[bench.name] = result
+                base = base_results.get(bench.name)
+                delta = f"{result['median_ms'] / base['median_ms'] - 1:+.0%}" if base and base["median_ms"] else "-"
+                print(
+                    f"{bench.name:<28}{bench.items:>7}{result['median_ms']:>12.3f}{result['min_ms']:>10.3f}"
+                    f"{result['throughput']:>11.0f}{result['peak_kb']:>10.0f}{result['retained_kb']:>11.0f}{delta:>9}"
+                )
+                found = _compare(bench.name, result, base, args.time_tolerance, args.mem_tolerance)
+                if found and not args.update_baseline:
+                    # confirma antes de acusar: mede de novo, com o dobro de execuções
+                    result = results[bench.name] = _measure(bench, args.repeat * 2)
+                    found = _compare(bench.name, result, base, args.time_tolerance, args.mem_tolerance)
+                    print(f"{'  (remedido)':<35}{result['median_ms']:>12.3f}{'' if found else '  ok'}")
+                problems += found
+        finally:
+            cache.CACHE_DIR, cache.BODIES_DIR = original_dirs
+
+    if args.update_baseline:
+        merged = {**base_results, **results} if args.only else results
+        BASELINE_PATH.write_text(json.dumps({"environment": environment, "results": merged}, indent=2, sort_keys=True) + "\n")
+        print(f"\nbaseline gravada em {BASELINE_PATH.relative_to(BACKEND_DIR)}")
+        return
+    if not base_results:
+        print("\nsem baseline; grave uma com --update-baseline")
+        return
+    if problems:
+        print("\nREGRESSÃO:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("\nsem regressões em relação à baseline")
+
+
+if __name__ == "__main__":
+    main_cli()
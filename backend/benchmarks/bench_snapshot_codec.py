@@ -0,0 +1,121 @@
+"""
+Compara o snapshot em JSON (formato legado) com o binário msgpack de utils/cache.py.
+
+Para cada cache/season_*.json mede o tempo de carga completa, o tempo para ler uma
+única corrida e o tamanho em disco; depois mede o RSS de carregar todas as temporadas
+em um processo novo por formato.
+
+    cd backend
+    python benchmarks/bench_snapshot_codec.py [--repeat 50]
+"""
+import argparse
+import json
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from utils.cache import CACHE_DIR, JsonCodec, MsgpackCodec  # noqa: E402
+
+
+def _timeit(fn, repeat: int) -> float:
+    """Melhor tempo (ms) entre `repeat` execuções."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _current_rss_kb() -> float:
+    try:  # Linux: resident pages atuais
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize() / 1024
+    except OSError:
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _rss_child(fmt: str, paths: list) -> None:
+    codec = MsgpackCodec() if fmt == "msgpack" else JsonCodec()
+    before = _current_rss_kb()
+    tracemalloc.start()
+    loaded = [codec.read(pathlib.Path(p)) for p in paths]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after = _current_rss_kb()
+    print(json.dumps({
+        "seasons": len(loaded),
+        "rss_delta_kb": after - before,
+        "alloc_kb": current / 1024,
+        "alloc_peak_kb": peak / 1024,
+    }))
+
+
+def _rss(fmt: str, paths: list) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--rss-child", fmt, *map(str, paths)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rss-child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child:
+        _rss_child(args.rss_child[0], args.rss_child[1:])
+        return
+
+    json_codec, bin_codec = JsonCodec(), MsgpackCodec()
+    sources = sorted(CACHE_DIR.glob("season_*.json"))
+    sources = [p for p in sources if not p.name.endswith(".meta.json")]
+    if not sources:
+        sys.exit(f"nenhum season_*.json em {CACHE_DIR}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_paths, bin_paths = [], []
+        print(f"{'temporada':<12}{'json KB':>9}{'bin KB':>9}{'json ms':>10}{'bin ms':>9}{'1 corrida json':>16}{'1 corrida bin':>15}")
+        for src in sources:
+            data = json_codec.read(src)
+            bin_path = pathlib.Path(tmp) / f"{src.stem}{bin_codec.ext}"
+            bin_path.write_bytes(bin_codec.encode(data))
+            json_paths.append(src)
+            bin_paths.append(bin_path)
+
+            race_id = data["races"][len(data["races"]) // 2]["id"] if data.get("races") else ""
+
+            def _json_one_race():
+                return next(r for r in json_codec.read(src)["races"] if r["id"] == race_id)
+
+            json_ms = _timeit(lambda: json_codec.read(src), args.repeat)
+            bin_ms = _timeit(lambda: bin_codec.read(bin_path), args.repeat)
+            json_race_ms = _timeit(_json_one_race, args.repeat) if race_id else 0.0
+            bin_race_ms = _timeit(lambda: bin_codec.read_item(bin_path, "races", race_id), args.repeat) if race_id else 0.0
+            print(
+                f"{src.stem:<12}{src.stat().st_size / 1024:>9.1f}{bin_path.stat().st_size / 1024:>9.1f}"
+                f"{json_ms:>10.2f}{bin_ms:>9.2f}{json_race_ms:>16.3f}{bin_race_ms:>15.3f}"
+            )
+
+        print()
+        for fmt, paths in (("json", json_paths), ("msgpack", bin_paths)):
+            rss = _rss(fmt, paths)
+            print(
+                f"{fmt:<8} {rss['seasons']} temporadas: RSS +{rss['rss_delta_kb'] / 1024:.1f} MB, "
+                f"retido {rss['alloc_kb'] / 1024:.1f} MB, pico de alocação {rss['alloc_peak_kb'] / 1024:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
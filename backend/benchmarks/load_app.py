@@ -0,0 +1,59 @@
+"""
+O `app` do main.py como o harness de carga (loadtest.py) o sobe no uvicorn.
+
+Ergast e OpenF1 já são trocados por ERGAST_BASE_URL/OPENF1_BASE_URL. O FastF1 não tem
+URL configurável, então aqui o calendário e a classificação de cada rodada passam a
+vir do servidor substituto em LOADTEST_FASTF1_URL (latência e falhas configuráveis lá).
+Modela a espera de rede do `session.load`, não o custo de CPU do parse do FastF1.
+"""
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import pandas as pd
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import main  # noqa: E402
+from utils.sessions import FASTF1_ROUND_TIMEOUT, FASTF1_WORKERS  # noqa: E402
+
+LOADTEST_FASTF1_URL = os.environ["LOADTEST_FASTF1_URL"]
+
+_client = httpx.Client(base_url=LOADTEST_FASTF1_URL, timeout=FASTF1_ROUND_TIMEOUT)
+
+
+def _get_event_schedule(season: int, include_testing: bool = False) -> pd.DataFrame:
+    resp = _client.get(f"/fastf1/{season}/schedule")
+    resp.raise_for_status()
+    schedule = pd.DataFrame(resp.json())
+    schedule["EventDate"] = pd.to_datetime(schedule["EventDate"])
+    return schedule
+
+
+def _load_round(season: int, round_number: int) -> Tuple[List[Dict[str, Any]], float]:
+    start = time.perf_counter()
+    resp = _client.get(f"/fastf1/{season}/{round_number}")
+    resp.raise_for_status()
+    return resp.json(), time.perf_counter() - start
+
+
+def _submit_rounds(
+    season: int,
+    rounds: List[int],
+    cache_dir: str,
+    workers: int = FASTF1_WORKERS,
+    timeout: float = FASTF1_ROUND_TIMEOUT,
+) -> Tuple[Executor, Dict[int, Future]]:
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fastf1-standin")
+    return executor, {rnd: executor.submit(_load_round, season, rnd) for rnd in rounds}
+
+
+main.fastf1.get_event_schedule = _get_event_schedule
+main.submit_rounds = _submit_rounds
+
+app = main.app
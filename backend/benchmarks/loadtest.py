@@ -0,0 +1,401 @@
+"""
+Teste de carga ponta a ponta: sobe o `app` no uvicorn com N workers, troca Ergast,
+OpenF1 e a fonte do FastF1 por um servidor local (latência e taxa de falha
+configuráveis, dados de benchmarks/fixtures/) e dispara misturas de tráfego:
+
+- warm:   polling de /api/v1/overview em temporadas já em cache (copiadas de cache/)
+- cold:   rajadas de `concorrência` clientes pedindo a mesma temporada ainda não
+          construída (uma temporada nova por rajada, de 1950 em diante)
+- fanout: lista /api/v1/races?fields=id e pede o detalhe de todas as corridas em paralelo
+
+Para cada (workers, cenário, concorrência) mostra vazão, p50/p99, erros e o RSS
+somado do uvicorn (master + workers); --json grava tudo, inclusive as amostras de RSS.
+
+    cd backend
+    python benchmarks/loadtest.py --workers 1,2,4 --concurrency 1,8,32 --duration 10
+    python benchmarks/loadtest.py --scenarios cold --fastf1-latency 2 --failure-rate 0.05
+
+O gerador de carga é um único processo asyncio: em concorrências muito altas ele
+pode virar o gargalo antes do servidor.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import pathlib
+import random
+import re
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from record_fixtures import FIXTURES_DIR, load_fixture  # noqa: E402
+
+# Temporadas frias: não estão em cache/ e o main aceita season >= 1950
+COLD_SEASONS = range(1950, 2020)
+
+
+# --------------------------------------------------------------------------- upstreams
+
+
+class StandInUpstreams:
+    """
+    Ergast (/ergast), OpenF1 (/openf1) e FastF1 (/fastf1, lido pelo load_app.py) num
+    servidor HTTP local. Qualquer temporada devolve os dados da fixture.
+    """
+
+    def __init__(self, fixture: Dict[str, Any], latency: Dict[str, float], failure_rate: float):
+        self.fixture = fixture
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests: Dict[str, int] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInUpstreams":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def route(self, path: str, query: Dict[str, List[str]]) -> Tuple[str, Optional[Any]]:
+        """(serviço, corpo JSON) de um path; corpo None = 404."""
+        fixture = self.fixture
+        parts = [p for p in path.split("/") if p]
+        service = parts[0] if parts else ""
+        if service == "ergast":
+            races = fixture["ergast"]
+            if len(parts) == 2 and parts[1].endswith(".json"):
+                table = [{k: v for k, v in race.items() if k != "Results"} for race in races]
+                return service, {"MRData": {"RaceTable": {"Races": table}}}
+            if len(parts) == 4 and parts[3] == "results.json":
+                found = [race for race in races if race["round"] == parts[2]]
+                return service, {"MRData": {"RaceTable": {"Races": found}}}
+        elif service == "openf1":
+            if parts[1:] == ["sessions"]:
+                return service, [{"session_key": 1, "year": int(query.get("year", ["0"])[0] or 0)}]
+            if parts[1:] == ["drivers"]:
+                return service, fixture["openf1_drivers"]
+        elif service == "fastf1" and len(parts) == 3:
+            if parts[2] == "schedule":
+                return service, fixture["schedule"]
+            return service, fixture["fastf1"].get(parts[2])
+        return service, None
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 - API do http.server
+                parsed = urlparse(self.path)
+                service, body = upstreams.route(parsed.path, parse_qs(parsed.query))
+                upstreams.requests[service] = upstreams.requests.get(service, 0) + 1
+                # latência com jitter de ±50% em torno da média do serviço
+                time.sleep(upstreams.latency.get(service, 0.0) * (0.5 + random.random()))
+                if random.random() < upstreams.failure_rate:
+                    self._send(503, {"detail": "falha simulada"})
+                elif body is None:
+                    self._send(404, {"detail": "não encontrado"})
+                else:
+                    self._send(200, body)
+
+            def _send(self, status: int, body: Any) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# --------------------------------------------------------------------------- servidor
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            match = re.search(r"VmRSS:\s+(\d+)", fh.read())
+        return int(match.group(1)) if match else 0
+    except OSError:
+        return 0
+
+
+def _process_tree(root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in pathlib.Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry.name))
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+class AppServer:
+    """uvicorn com N workers servindo benchmarks/load_app.py, com cache e FastF1 em um diretório temporário."""
+
+    def __init__(self, workers: int, upstreams: StandInUpstreams, warm_sources: List[pathlib.Path], workdir: pathlib.Path):
+        self.workers = workers
+        self.port = _free_port()
+        self.workdir = workdir
+        self.log_path = workdir / "uvicorn.log"
+        cache = workdir / "cache"
+        cache.mkdir(parents=True)
+        for src in warm_sources:
+            shutil.copy2(src, cache / src.name)
+        self.env = {
+            **os.environ,
+            "SNAPSHOT_CACHE_DIR": str(cache),
+            "FASTF1_CACHE_DIR": str(workdir / "fastf1"),
+            "ERGAST_BASE_URL": f"{upstreams.url}/ergast",
+            "OPENF1_BASE_URL": f"{upstreams.url}/openf1",
+            "LOADTEST_FASTF1_URL": upstreams.url,
+            "SPAN_LOG": "0",
+        }
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 120.0) -> None:
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "load_app:app",
+                "--app-dir", str(BENCH_DIR),
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers),
+                "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=str(BACKEND_DIR),
+            env=self.env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+        # pronto = /readyz 200 (prewarm concluído) várias vezes seguidas, para cobrir todos os workers
+        deadline, streak = time.monotonic() + timeout, 0
+        while streak < self.workers * 3:
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"uvicorn não ficou pronto; veja {self.log_path}")
+            try:
+                streak = streak + 1 if httpx.get(f"{self.url}/readyz", timeout=2).status_code == 200 else 0
+            except httpx.HTTPError:
+                streak = 0
+            time.sleep(0.1)
+
+    def rss_mb(self) -> float:
+        if self.process is None:
+            return 0.0
+        return sum(_rss_kb(pid) for pid in _process_tree(self.process.pid)) / 1024
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+class RssSampler:
+    def __init__(self, server: AppServer, interval: float = 0.25):
+        self.server = server
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss", daemon=True)
+
+    def _run(self) -> None:
+        start = time.monotonic()
+        while not self._stop.is_set():
+            self.samples.append((round(time.monotonic() - start, 2), round(self.server.rss_mb(), 1)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+# --------------------------------------------------------------------------- cenários
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            resp = await client.get(url)
+        except httpx.HTTPError:
+            self.errors += 1
+            return None
+        self.latencies.append(time.perf_counter() - start)
+        if resp.status_code >= 400:
+            self.errors += 1
+        return resp
+
+
+async def _warm(client: httpx.AsyncClient, rec: Recorder, until: float, seasons: List[int], **_) -> None:
+    while time.monotonic() < until:
+        await rec.get(client, f"/api/v1/overview?season={random.choice(seasons)}")
+
+
+async def _fanout(client: httpx.AsyncClient, rec: Recorder, until: float, seasons: List[int], **_) -> None:
+    while time.monotonic() < until:
+        resp = await rec.get(client, f"/api/v1/races?season={random.choice(seasons)}&fields=id")
+        if resp is None or resp.status_code != 200:
+            continue
+        await asyncio.gather(*(rec.get(client, f"/api/races/{race['id']}") for race in resp.json()))
+
+
+SCENARIOS = {"warm": _warm, "fanout": _fanout}
+
+
+async def _run_step(base_url: str, scenario: str, concurrency: int, duration: float, seasons: List[int], cold: Iterator[int]) -> Dict[str, Any]:
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=concurrency * 4, max_keepalive_connections=concurrency * 4)
+    headers = {"Accept-Encoding": "br, gzip"}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=600.0, headers=headers) as client:
+        start = time.monotonic()
+        until = start + duration
+        if scenario == "cold":
+            # rajadas: todos os clientes pedem a mesma temporada fria; a próxima rajada usa outra
+            while time.monotonic() < until:
+                season = next(cold, None)
+                if season is None:
+                    print("  (temporadas frias esgotadas)")
+                    break
+                await asyncio.gather(*(rec.get(client, f"/api/drivers?season={season}") for _ in range(concurrency)))
+        else:
+            await asyncio.gather(*(SCENARIOS[scenario](client, rec, until, seasons) for _ in range(concurrency)))
+        elapsed = time.monotonic() - start
+
+    latencies = sorted(rec.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": rec.errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(x) for x in value.split(",") if x.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=_int_list, default=[1, 2], help="workers do uvicorn (ex.: 1,2,4)")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="clientes simultâneos (ex.: 1,8,32)")
+    parser.add_argument("--scenarios", default="warm,cold,fanout")
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por passo")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="latência média (s) do Ergast/OpenF1 substitutos")
+    parser.add_argument("--fastf1-latency", type=float, default=0.5, help="latência média (s) de cada rodada do FastF1 substituto")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fração de respostas 503 dos substitutos")
+    parser.add_argument("--fixture", type=pathlib.Path, help="fixture dos substitutos (padrão: a primeira em benchmarks/fixtures/)")
+    parser.add_argument("--json", type=pathlib.Path, help="grava resultados e amostras de RSS neste arquivo")
+    args = parser.parse_args()
+
+    fixture_path = args.fixture or next(iter(sorted(FIXTURES_DIR.glob("season_*.json.gz"))), None)
+    if fixture_path is None:
+        sys.exit(f"nenhuma fixture em {FIXTURES_DIR}; rode benchmarks/record_fixtures.py")
+    warm_sources = sorted((BACKEND_DIR / "cache").glob("season_20*.*"))
+    seasons = sorted({int(p.name.split(".")[0].split("_")[1]) for p in warm_sources})
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    if not seasons and set(scenarios) - {"cold"}:
+        sys.exit("warm/fanout precisam de cache/season_20*.json")
+
+    latency = {"ergast": args.upstream_latency, "openf1": args.upstream_latency, "fastf1": args.fastf1_latency}
+    upstreams = StandInUpstreams(load_fixture(fixture_path), latency, args.failure_rate).start()
+    rows: List[Dict[str, Any]] = []
+    print(f"{'workers':>7} {'cenário':<8}{'conc':>6}{'req':>8}{'erros':>7}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>9}{'pico MB':>9}")
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory(prefix="f1-loadtest-") as tmp:
+                server = AppServer(workers, upstreams, warm_sources, pathlib.Path(tmp))
+                server.start()
+                cold = iter(COLD_SEASONS)
+                try:
+                    for scenario, concurrency in itertools.product(scenarios, args.concurrency):
+                        with RssSampler(server) as sampler:
+                            step = asyncio.run(_run_step(server.url, scenario, concurrency, args.duration, seasons, cold))
+                        rss = [value for _, value in sampler.samples] or [0.0]
+                        row = {"workers": workers, "scenario": scenario, "concurrency": concurrency, **step,
+                               "rss_mb": rss[-1], "rss_peak_mb": max(rss), "rss_samples": sampler.samples}
+                        rows.append(row)
+                        print(
+                            f"{workers:>7} {scenario:<8}{concurrency:>6}{row['requests']:>8}{row['errors']:>7}"
+                            f"{row['rps']:>9.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['rss_mb']:>9.0f}{row['rss_peak_mb']:>9.0f}"
+                        )
+                finally:
+                    server.stop()
+    finally:
+        upstreams.stop()
+
+    print(f"\nrequisições aos substitutos: {dict(sorted(upstreams.requests.items()))}")
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "rows": rows}, indent=2))
+        print(f"resultados em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
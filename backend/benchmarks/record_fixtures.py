@@ -0,0 +1,175 @@
+"""
+Grava as fixtures usadas por bench_hot_paths.py: calendário do FastF1, classificação
+de cada rodada (FastF1), corridas do Ergast e pilotos do OpenF1 de uma temporada, em
+benchmarks/fixtures/season_<ano>.json.gz.
+
+Com --live busca tudo nos serviços reais (precisa de rede). Sem --live, monta os
+mesmos formatos a partir de cache/season_<ano>.json, para rodar tudo offline; nesse
+caso os números dos pilotos são sintéticos (o snapshot não guarda driver_number).
+
+    cd backend
+    python benchmarks/record_fixtures.py [--season 2024] [--live]
+"""
+import argparse
+import gzip
+import json
+import pathlib
+import sys
+from typing import Any, Dict, List
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+FIXTURES_DIR = pathlib.Path(__file__).resolve().parent / "fixtures"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def fixture_path(season: int) -> pathlib.Path:
+    return FIXTURES_DIR / f"season_{season}.json.gz"
+
+
+def load_fixture(path: pathlib.Path) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _split_name(full_name: str) -> List[str]:
+    given, _, family = full_name.partition(" ")
+    return [given, family]
+
+
+def _from_cache(season: int) -> Dict[str, Any]:
+    from utils.cache import CACHE_DIR, JsonCodec
+
+    snapshot = JsonCodec().read(CACHE_DIR / f"season_{season}.json")
+    drivers = {d["id"]: d for d in snapshot["drivers"]}
+    numbers = {driver_id: str(i + 1) for i, driver_id in enumerate(sorted(drivers))}
+
+    schedule, fastf1_rounds, ergast_races = [], {}, []
+    for race in snapshot["races"]:
+        rnd = race["round"]
+        schedule.append({
+            "RoundNumber": rnd,
+            "EventName": race["name"],
+            "Location": race["circuit"],
+            "Country": race.get("country"),
+            "EventDate": race["date"],
+        })
+        rows, results = [], []
+        for res in race["results"]:
+            meta = drivers.get(res["driverId"], {})
+            number = numbers.get(res["driverId"], res["driverId"])
+            rows.append({
+                "DriverNumber": number,
+                "Abbreviation": res["driverId"].upper(),
+                "FullName": res["driver"],
+                "TeamName": res["team"],
+                "TeamColor": (meta.get("teamColor") or "").lstrip("#"),
+                "Position": float(res["position"]),
+                "GridPosition": float(res["gridPosition"]) if res.get("gridPosition") is not None else None,
+                "Points": float(res["points"]),
+                "FastestLapTime": res.get("avgLapTime"),
+                "Status": "Finished",
+            })
+            given, family = _split_name(res["driver"])
+            results.append({
+                "position": str(res["position"]),
+                "grid": str(res["gridPosition"]) if res.get("gridPosition") is not None else "",
+                "points": str(res["points"]),
+                "Driver": {
+                    "driverId": res["driverId"],
+                    "code": res["driverId"].upper(),
+                    "permanentNumber": number,
+                    "givenName": given,
+                    "familyName": family,
+                },
+                "Constructor": {"name": res["team"]},
+                "FastestLap": {"Time": {"time": res["avgLapTime"]}} if res.get("avgLapTime") else {},
+            })
+        fastf1_rounds[str(rnd)] = rows
+        ergast_races.append({
+            "round": str(rnd),
+            "raceName": race["name"],
+            "date": race["date"],
+            "Circuit": {"circuitName": race["circuit"], "Location": {"country": race.get("country")}},
+            "Results": results,
+        })
+
+    openf1_drivers = [
+        {
+            "driver_number": int(numbers[driver_id]),
+            "session_key": 1,
+            "full_name": d.get("name"),
+            "name_acronym": d.get("shortName"),
+            "team_colour": (d.get("teamColor") or "").lstrip("#"),
+            "country_code": d.get("country"),
+            "headshot_url": d.get("photo"),
+        }
+        for driver_id, d in sorted(drivers.items())
+    ]
+    return {
+        "season": season,
+        "source": "cache",
+        "schedule": schedule,
+        "fastf1": fastf1_rounds,
+        "ergast": ergast_races,
+        "openf1_drivers": openf1_drivers,
+    }
+
+
+def _from_live(season: int) -> Dict[str, Any]:
+    import main
+    from utils.sessions import load_round_classification
+
+    schedule = []
+    events = main.fastf1.get_event_schedule(season, include_testing=False)
+    for _, event in events.iterrows():
+        rnd = main._safe_int(event.get("RoundNumber"), 0)
+        if rnd <= 0 or not main._event_has_happened(event):
+            continue
+        info = main._event_info(event)
+        schedule.append({
+            "RoundNumber": rnd,
+            "EventName": info["name"],
+            "Location": info["circuit"],
+            "Country": info["country"],
+            "EventDate": info["date"],
+        })
+    fastf1_rounds = {
+        str(item["RoundNumber"]): load_round_classification(season, item["RoundNumber"])
+        for item in schedule
+    }
+    sessions = main.openf1.get_json("/sessions", params={"year": season, "session_name": "Race"})
+    openf1_drivers = [
+        entry
+        for session_key in sorted({s["session_key"] for s in sessions if s.get("session_key")})
+        for entry in main.openf1.get_json("/drivers", params={"session_key": session_key})
+    ]
+    return {
+        "season": season,
+        "source": "live",
+        "schedule": schedule,
+        "fastf1": fastf1_rounds,
+        "ergast": main._fetch_ergast_results_full(season),
+        "openf1_drivers": openf1_drivers,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--season", type=int, default=2024)
+    parser.add_argument("--live", action="store_true", help="busca nos serviços reais em vez de cache/")
+    args = parser.parse_args()
+
+    fixture = _from_live(args.season) if args.live else _from_cache(args.season)
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    path = fixture_path(args.season)
+    # default=str: Timedelta/Timestamp do pandas viram texto; NaN continua NaN (json aceita)
+    payload = json.dumps(fixture, ensure_ascii=False, default=str, sort_keys=True).encode("utf-8")
+    path.write_bytes(gzip.compress(payload, mtime=0))
+    print(
+        f"{path.relative_to(BACKEND_DIR)}: {len(fixture['schedule'])} rodadas, "
+        f"{len(fixture['openf1_drivers'])} pilotos OpenF1, {len(payload) / 1024:.0f} KB -> {path.stat().st_size / 1024:.0f} KB"
+    )
+
+
+if __name__ == "__main__":
+    main()
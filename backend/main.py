@@ -1,14 +1,53 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import os
 import pathlib
-from collections import Counter, defaultdict
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Annotated, Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import fastf1
-import httpx
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from utils.cache import get_or_set_cache
+from utils.builds import BuildQueueFull, build_pool
+from utils.cache import (
+    BODY_ENCODINGS,
+    cached_keys,
+    content_hash,
+    get_or_set_cache,
+    get_or_set_hydrated,
+    in_flight,
+    is_cached,
+    memory_cache,
+    peek_body,
+    peek_content_hash,
+    peek_hydrated,
+    read_body,
+    read_cache,
+    read_cache_item,
+    refresh_cache,
+    register_renderer,
+    register_write_hook,
+    single_flight,
+)
+from utils.http import Upstream
+from utils.metrics import Counter, Histogram, observe_span, render as render_metrics, span
+from utils.progress import ProgressChannel, build_progress
+from utils.sessions import FASTF1_ROUND_TIMEOUT, submit_rounds
+from utils.store import RESULTS_STORE_ENABLED, results_store
 
 
 # Enable FastF1 cache to avoid re-downloading the same sessions
@@ -17,6 +56,85 @@ cache_dir.mkdir(parents=True, exist_ok=True)
 fastf1.Cache.enable_cache(str(cache_dir))
 
 OPENF1_BASE_URL = os.getenv("OPENF1_BASE_URL", "https://api.openf1.org/v1")
+# Metadados de pilotos do OpenF1 (cores, fotos) mudam pouco; guardados em cache/openf1_drivers*.json
+OPENF1_DRIVERS_TTL = float(os.getenv("OPENF1_DRIVERS_TTL", str(24 * 3600)))
+ERGAST_BASE_URL = os.getenv("ERGAST_BASE_URL", "https://api.jolpi.ca/ergast/f1")
+# Jolpica devolve no máximo 100 linhas por página
+ERGAST_PAGE_LIMIT = int(os.getenv("ERGAST_PAGE_LIMIT", "100"))
+
+# Um cliente com pool de conexões por upstream, compartilhado por todos os fetchers.
+# Jolpica (Ergast) limita a ~4 req/s; o OpenF1 não publica limite.
+ergast = Upstream(
+    "ergast",
+    ERGAST_BASE_URL,
+    timeout=30.0,
+    max_concurrency=int(os.getenv("ERGAST_MAX_CONCURRENCY", "4")),
+    rate_per_second=float(os.getenv("ERGAST_RATE_LIMIT", "4")),
+)
+openf1 = Upstream(
+    "openf1",
+    OPENF1_BASE_URL,
+    timeout=20.0,
+    max_concurrency=int(os.getenv("OPENF1_MAX_CONCURRENCY", "4")),
+)
+
+# Frescor da temporada em andamento: TTL e/ou expiração após cada evento do calendário.
+# EventDate é a data (00:00) da corrida; os resultados costumam sair algumas horas depois.
+CURRENT_SEASON_TTL = float(os.getenv("CURRENT_SEASON_TTL", str(6 * 3600)))
+EVENT_RESULTS_DELAY = float(os.getenv("EVENT_RESULTS_DELAY", str(20 * 3600)))
+
+# Fallback por rodada: prazo para o FastF1 entregar uma rodada antes de ir ao Ergast,
+# e (opcional, 0 = desligado) quando disparar uma requisição paralela ao Ergast
+ROUND_DEADLINE = float(os.getenv("ROUND_DEADLINE", str(FASTF1_ROUND_TIMEOUT)))
+ERGAST_HEDGE_AFTER = float(os.getenv("ERGAST_HEDGE_AFTER", "0"))
+
+# Tamanho dos leaderboards extras do overview (momentum)
+OVERVIEW_LEADERBOARD_SIZE = int(os.getenv("OVERVIEW_LEADERBOARD_SIZE", "5"))
+
+# /api/v1/seasons: quantas temporadas são resolvidas (cache ou build) ao mesmo tempo por requisição
+SEASONS_STREAM_CONCURRENCY = int(os.getenv("SEASONS_STREAM_CONCURRENCY", "3"))
+
+# Métricas do pipeline e da API; expostas em /metrics junto com as de cache e upstreams
+ergast_fallbacks = Counter(
+    "f1_ergast_fallback_total",
+    "Rodadas (ou temporadas inteiras, reason=schedule) servidas pelo Ergast no lugar do FastF1.",
+    ["reason"],
+)
+http_request_seconds = Histogram(
+    "f1_http_request_seconds",
+    "Latência por endpoint até os headers da resposta (streams: tempo até o primeiro byte).",
+    ["method", "route", "status"],
+)
+
+# Build frio pedido por um request: quanto (s) o request espera antes de responder 202
+# (0 = espera o build terminar) e o Retry-After das respostas 202/503
+BUILD_WAIT_SECONDS = float(os.getenv("BUILD_WAIT_SECONDS", "0"))
+BUILD_RETRY_AFTER = int(os.getenv("BUILD_RETRY_AFTER", "10"))
+
+# Prewarm no startup: carrega todo cache/season_*.json em memória e constrói as temporadas listadas
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") not in ("0", "false", "False")
+PREWARM_SEASONS = [int(x) for x in os.getenv("PREWARM_SEASONS", "").split(",") if x.strip()]
+
+# POST /api/v1/seasons/{season}/refresh só com `Authorization: Bearer <token>`; sem token a rota fica
+# desligada (o stale-while-revalidate já atualiza temporadas vencidas)
+REFRESH_TOKEN = os.getenv("REFRESH_TOKEN", "")
+
+# Temporadas que as rotas aceitam: de 1950 até a próxima (calendário já publicado)
+LAST_SEASON = date.today().year + 1
+# um alias só para todas as rotas: um `season` sem limite dispara build (e snapshot) de ano inexistente
+SeasonQuery = Annotated[int, Query(ge=1950, le=LAST_SEASON)]
+SeasonPath = Annotated[int, Path(ge=1950, le=LAST_SEASON)]
+
+# Cache-Control: temporadas encerradas não mudam; a atual muda a cada corrida
+PAST_SEASON_MAX_AGE = int(os.getenv("PAST_SEASON_MAX_AGE", "86400"))
+CURRENT_SEASON_MAX_AGE = int(os.getenv("CURRENT_SEASON_MAX_AGE", "60"))
+# Formato das respostas: entra nas ETags e nos corpos pré-renderizados. Suba sempre que o
+# layout de um corpo mudar (temporadas passadas vão como `immutable`; sem isso o cliente
+# continuaria com a versão antiga e receberia 304).
+# 2: overview com momentumLeaders/teamStandings; 3: circuitId nas corridas; 4: corpo races_latest
+RESPONSE_FORMAT_VERSION = "4"
+# `limit` padrão de /api/v1/races (o que o dashboard consulta): tem corpo pré-renderizado próprio
+RACES_DEFAULT_LIMIT = 10
 
 
 class RaceResult(BaseModel):
@@ -34,6 +152,8 @@ class Race(BaseModel):
     id: str
     name: str
     circuit: str
+    # chave do circuito independente da fonte (circuitId do Ergast); None em snapshots antigos
+    circuitId: Optional[str] = None
     country: Optional[str]
     date: str
     round: int
@@ -61,6 +181,22 @@ class Driver(BaseModel):
 
 
 
+class LeaderboardEntry(BaseModel):
+    id: str
+    name: str
+    team: str
+    teamColor: str
+    value: float
+
+
+class TeamStanding(BaseModel):
+    team: str
+    teamColor: str
+    points: float
+    wins: int
+    podiums: int
+
+
 class SeasonOverview(BaseModel):
     leader: Driver
     highlights: List[str]
@@ -72,9 +208,109 @@ class SeasonOverview(BaseModel):
     winnersCount: int
     podiumTeamsCount: int
     totalRoundsInSeason: int | None = None
+    # leaderboards calculados no mesmo passe do overview (no build do snapshot)
+    momentumLeaders: List[LeaderboardEntry] = []
+    teamStandings: List[TeamStanding] = []
 
 
-app = FastAPI(title="F1 Data Bridge", version="0.1.0")
+class DriverRaceResult(BaseModel):
+    raceId: str
+    round: int
+    race: str
+    circuit: str
+    date: Optional[str] = None
+    team: str
+    position: int
+    gridPosition: Optional[int] = None
+    positionChange: int = 0
+    points: float = 0
+    avgLapTime: Optional[str] = None
+
+
+class TeamRoundStanding(BaseModel):
+    raceId: str
+    round: int
+    points: float
+    totalPoints: float
+    position: int
+
+
+class TeamProgression(BaseModel):
+    team: str
+    teamColor: Optional[str] = None
+    season: int
+    rounds: List[TeamRoundStanding]
+
+
+class CircuitRace(BaseModel):
+    season: int
+    id: str
+    round: int
+    name: str
+    circuit: str
+    country: Optional[str] = None
+    date: Optional[str] = None
+    fastestLap: Optional[str] = None
+    results: List[RaceResult]
+
+
+_prewarm_state: Dict[str, Any] = {"done": not PREWARM_ENABLED, "errors": {}}
+
+
+def _cached_seasons() -> List[int]:
+    seasons = [key[len("season_"):] for key in cached_keys("season_")]
+    return sorted((int(s) for s in seasons if s.isdigit()), reverse=True)
+
+
+def _prewarm() -> None:
+    """
+    Hydrate the newest seasons that fit in the memory tier, oldest first, so the current
+    season ends up most recently used in the LRU; older cached seasons only get their
+    ETag, bodies and index ready. Configured seasons that are missing are built.
+    """
+    cached = _cached_seasons()
+    targets = sorted(set(cached) | set(PREWARM_SEASONS), reverse=True)
+    capacity = memory_cache.max_entries or len(targets)
+    hot = sorted(targets[:capacity])
+    rest = sorted(targets[capacity:])
+    print(f"[prewarm] aquecendo temporadas: {hot} (só disco: {[s for s in rest if s in cached]})")
+    # o resto primeiro: builds de temporadas configuradas que não cabem saem do LRU em seguida
+    for season in rest + hot:
+        try:
+            if season in hot or season not in cached:
+                _season_snapshot(season)
+            content_hash(f"season_{season}")  # ETag pronta para o primeiro If-None-Match
+            read_body(f"season_{season}", "drivers")  # gera os corpos comprimidos de snapshots antigos
+            if RESULTS_STORE_ENABLED:
+                _ensure_indexed(season)  # snapshots gravados antes do índice SQLite
+        except Exception as exc:
+            print(f"[prewarm] temporada {season} falhou: {exc}")
+            _prewarm_state["errors"][str(season)] = str(exc)
+    _prewarm_state["done"] = True
+    print("[prewarm] concluído")
+
+
+def _season_state(season: int) -> str:
+    key = f"season_{season}"
+    if memory_cache.contains(key):
+        return "warm"
+    if build_pool.state(key) == "queued":
+        return "queued"
+    if in_flight(key) or in_flight(f"memory:{key}") or build_pool.state(key):
+        return "building"
+    return "cold"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PREWARM_ENABLED:
+        threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+    yield
+    ergast.close()
+    openf1.close()
+
+
+app = FastAPI(title="F1 Data Bridge", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -88,9 +324,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # paginação e revalidação vão em headers: o front (outra origem) precisa conseguir lê-los
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
 
 
+@app.middleware("http")
+async def _record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # rótulo = template da rota (/api/races/{race_id}), não o path, para não explodir a cardinalidade
+        route = request.scope.get("route")
+        http_request_seconds.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+
+
 def slugify(value: str) -> str:
     return (
         value.lower()
@@ -144,29 +401,51 @@ def _safe_float(value: Any, default: float = 0.0) -> float:
 
 
 def _fetch_ergast_results(season: int) -> List[Dict[str, Any]]:
-    """Fetch full season results from Ergast API."""
-    # Use HTTPS to avoid 403 blocks
-    url = f"https://api.jolpi.ca/ergast/f1/{season}/results.json"
-
-    params = {"limit": 1200}
+    """
+    Fetch full season results from Ergast API, walking MRData offset/limit/total.
+    Pages after the first are requested concurrently; races split across page
+    boundaries are stitched back together. Returns [] if any page fails, so the
+    caller can fall back to the per-round fetcher instead of caching a partial season.
+    """
+    path = f"/{season}/results.json"
     try:
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-        return data.get("MRData", {}).get("RaceTable", {}).get("Races", [])
+        first = ergast.get_json(path, params={"limit": ERGAST_PAGE_LIMIT, "offset": 0})
     except Exception as exc:  # pragma: no cover - defensive
         print(f"[ergast] Failed to fetch results for {season}: {exc}")
         return []
 
+    mr_data = first.get("MRData", {})
+    total = _safe_int(mr_data.get("total"), 0)
+    # o servidor pode reduzir o limite pedido; pagina com o que ele devolveu
+    limit = _safe_int(mr_data.get("limit"), ERGAST_PAGE_LIMIT) or ERGAST_PAGE_LIMIT
+
+    def _page(offset: int) -> Optional[Dict[str, Any]]:
+        try:
+            return ergast.get_json(path, params={"limit": limit, "offset": offset})
+        except Exception as exc:
+            print(f"[ergast] Failed results page {season} offset={offset}: {exc}")
+            return None
+
+    pages = [first] + ergast.map(_page, range(limit, total, limit))
+    if any(page is None for page in pages):
+        return []
+
+    merged: Dict[int, Dict[str, Any]] = {}
+    for page in pages:
+        for race in page.get("MRData", {}).get("RaceTable", {}).get("Races", []):
+            round_number = _safe_int(race.get("round"), 0)
+            existing = merged.get(round_number)
+            if existing is None:
+                merged[round_number] = {**race, "Results": list(race.get("Results", []))}
+            else:
+                existing["Results"].extend(race.get("Results", []))
+
+    return [merged[rnd] for rnd in sorted(merged) if rnd > 0 and merged[rnd]["Results"]]
+
 def _fetch_ergast_round(season: int, round_number: int) -> Optional[Dict[str, Any]]:
-    url = f"https://api.jolpi.ca/ergast/f1/{season}/{round_number}/results.json"
     params = {"limit": 500}
     try:
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+        data = ergast.get_json(f"/{season}/{round_number}/results.json", params=params)
         races = data.get("MRData", {}).get("RaceTable", {}).get("Races", [])
         return races[0] if races else None
     except Exception as exc:
@@ -174,15 +453,26 @@ def _fetch_ergast_round(season: int, round_number: int) -> Optional[Dict[str, An
         return None
 
 
+def _fetch_ergast_circuit_ids(season: int) -> Dict[int, str]:
+    """Rodada -> circuitId do Ergast, para as rodadas do FastF1 (que só traz o nome do local)."""
+    try:
+        data = ergast.get_json(f"/{season}.json", params={"limit": 100})
+    except Exception as exc:
+        print(f"[ergast] Failed circuit ids {season}: {exc}")
+        return {}
+    ids: Dict[int, str] = {}
+    for race in data.get("MRData", {}).get("RaceTable", {}).get("Races", []):
+        circuit_id = (race.get("Circuit") or {}).get("circuitId")
+        if circuit_id:
+            ids[_safe_int(race.get("round"), 0)] = circuit_id
+    return ids
+
+
 def _fetch_ergast_results_full(season: int) -> List[Dict[str, Any]]:
     # pega lista de corridas do ano (rodadas)
-    url = f"https://api.jolpi.ca/ergast/f1/{season}.json"
     params = {"limit": 100}
     try:
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+        data = ergast.get_json(f"/{season}.json", params=params)
         races = data.get("MRData", {}).get("RaceTable", {}).get("Races", [])
         rounds = sorted({_safe_int(r.get("round"), 0) for r in races if r.get("round")},)
         rounds = [r for r in rounds if r > 0]
@@ -190,12 +480,9 @@ def _fetch_ergast_results_full(season: int) -> List[Dict[str, Any]]:
         print(f"[ergast] Failed schedule list {season}: {exc}")
         return []
 
-    out: List[Dict[str, Any]] = []
-    for rnd in rounds:
-        race = _fetch_ergast_round(season, rnd)
-        if race and race.get("Results"):
-            out.append(race)
-    return out
+    # rodadas em paralelo (limitadas pela concorrência/taxa do upstream), na ordem original
+    fetched = ergast.map(lambda rnd: _fetch_ergast_round(season, rnd), rounds)
+    return [race for race in fetched if race and race.get("Results")]
 
     
 def _race_highlights(results: List[RaceResult], fastest_lap: Optional[str] = None) -> List[str]:
@@ -272,15 +559,9 @@ def _build_snapshot_from_openf1_only(openf1_lookup: Dict[str, Dict[str, Any]]) -
     }
 
 
-def _fetch_openf1_drivers() -> Dict[str, Dict[str, Any]]:
-    """Return latest OpenF1 driver metadata keyed by driver_number."""
-    with httpx.Client(timeout=20.0) as client:
-        resp = client.get(f"{OPENF1_BASE_URL}/drivers")
-        resp.raise_for_status()
-        data = resp.json()
-
+def _latest_by_driver_number(entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
     latest: Dict[str, Dict[str, Any]] = {}
-    for entry in data:
+    for entry in entries:
         num = entry.get("driver_number")
         if num is None:
             continue
@@ -291,163 +572,360 @@ def _fetch_openf1_drivers() -> Dict[str, Dict[str, Any]]:
     return latest
 
 
-def _build_snapshot_from_ergast(season: int, openf1_lookup: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
-    races: List[Race] = []
-    driver_stats: Dict[str, Dict[str, Any]] = defaultdict(
-        lambda: {
-            "points": 0.0,
-            "wins": 0,
-            "podiums": 0,
-            "positions": [],
-            "points_by_round": {},
-            "team": None,
-            "teamColor": "#71717a",
-            "country": None,
-            "name": None,
-            "shortName": None,
-            "photo": None,
-            "driver_number": None,
-        }
+def _fetch_openf1_season_drivers(season: int) -> Dict[str, Dict[str, Any]]:
+    """Drivers of the season's race sessions only (OpenF1 has data from 2023 on; {} before that)."""
+    sessions = openf1.get_json("/sessions", params={"year": season, "session_name": "Race"})
+    session_keys = sorted({s["session_key"] for s in sessions if s.get("session_key")})
+    if not session_keys:
+        return {}
+    try:
+        # /drivers não filtra por ano: uma consulta só pela faixa de session_key da temporada,
+        # depois só as corridas (treinos/testes no meio da faixa ficam de fora)
+        entries = openf1.get_json(f"/drivers?session_key>={session_keys[0]}&session_key<={session_keys[-1]}")
+        wanted = set(session_keys)
+        return _latest_by_driver_number([entry for entry in entries if entry.get("session_key") in wanted])
+    except Exception as exc:
+        # sem filtro por faixa: um /drivers por corrida (1 + N requests)
+        print(f"[openf1] Range query for season {season} failed ({exc}); fetching per session")
+    per_session = openf1.map(
+        lambda session_key: openf1.get_json("/drivers", params={"session_key": session_key}),
+        session_keys,
     )
-    team_points: Counter[str] = Counter()
+    return _latest_by_driver_number([entry for entries in per_session for entry in entries])
 
-    ergast_races = _fetch_ergast_results_full(season)
 
-    for race_data in ergast_races:
-        round_number = _safe_int(race_data.get("round"), 0)
-        event_name = race_data.get("raceName") or "Corrida"
-        circuit = race_data.get("Circuit", {}).get("circuitName", "Circuito")
-        country = race_data.get("Circuit", {}).get("Location", {}).get("country")
-        date = race_data.get("date") or ""
-        results_list: List[RaceResult] = []
+def _fetch_openf1_all_drivers() -> Dict[str, Dict[str, Any]]:
+    return _latest_by_driver_number(openf1.get_json("/drivers"))
 
-        for res in race_data.get("Results", []):
-            pos = _safe_int(res.get("position"), 0)
-            if pos <= 0:
-                continue
-            driver_info = res.get("Driver", {}) or {}
-            constructor = res.get("Constructor", {}) or {}
-            driver_id = (driver_info.get("code") or driver_info.get("driverId") or "").lower()
-            driver_number = driver_info.get("permanentNumber")
-            team_color = openf1_lookup.get(str(driver_number), {}).get("team_colour") if driver_number else None
-
-            points = _safe_float(res.get("points"), 0.0)
-            grid = _safe_int(res.get("grid"), None)
-            position_change = grid - pos if grid is not None else 0
-            fastest_lap = None
-            fastest = res.get("FastestLap")
-            if fastest:
-                time_data = fastest.get("Time")
-                if time_data:
-                    fastest_lap = time_data.get("time")
-
-            rr = RaceResult(
-                position=pos,
-                driverId=driver_id,
-                driver=f"{driver_info.get('givenName', '')} {driver_info.get('familyName', '')}".strip() or driver_info.get("driverId", ""),
-                team=constructor.get("name") or "Desconhecido",
-                gridPosition=grid,
-                positionChange=position_change,
-                points=points,
-                avgLapTime=fastest_lap,
-            )
-            results_list.append(rr)
-
-            stats = driver_stats[driver_id]
-            stats["points"] += points
-            stats["wins"] += 1 if pos == 1 else 0
-            stats["podiums"] += 1 if pos <= 3 else 0
-            stats["positions"].append(pos)
-            stats["points_by_round"][round_number] = points
-            stats["team"] = rr.team
-            if team_color:
-                stats["teamColor"] = team_color
-            stats["driver_number"] = driver_number or stats["driver_number"]
-            stats["name"] = stats["name"] or rr.driver
-            stats["shortName"] = stats["shortName"] or driver_info.get("code") or driver_info.get("driverId")
-            open_meta = openf1_lookup.get(str(driver_number)) if driver_number else None
-            if open_meta:
-                stats["teamColor"] = open_meta.get("team_colour") or stats["teamColor"]
-                stats["country"] = open_meta.get("country_code") or stats["country"]
-                stats["photo"] = open_meta.get("headshot_url") or stats["photo"]
-
-                # só preenche se ainda não tiver
-                if not stats["name"]:
-                    stats["name"] = open_meta.get("full_name")
-                if not stats["shortName"]:
-                    stats["shortName"] = open_meta.get("name_acronym")
-
-
-            team_points[rr.team] += points
-
-        if results_list:
-            results_sorted = sorted(results_list, key=lambda r: r.position)
-            fastest = min(
-                (r for r in results_sorted if r.avgLapTime),
-                key=lambda r: r.avgLapTime,
-                default=None,
-            )
-            fastest_lap_str = f"{fastest.driver} - {fastest.avgLapTime}" if fastest else None
-            races.append(
-                Race(
-                    id=f"{season}-{round_number:02d}-{slugify(event_name)}",
-                    name=event_name,
-                    circuit=circuit,
-                    country=country,
-                    date=date,
-                    round=round_number,
-                    results=results_sorted,
-                    highlights=_race_highlights(results_sorted, fastest_lap_str),
-                    fastestLap=fastest_lap_str,
-                )
+
+def _openf1_cached(key: str, builder_fn) -> Dict[str, Any]:
+    """get_or_set_cache com TTL; se o refetch falhar, serve a entrada expirada do disco em vez de abortar o build."""
+    try:
+        return get_or_set_cache(key=key, builder_fn=builder_fn, ttl=OPENF1_DRIVERS_TTL)
+    except Exception as exc:
+        stale = read_cache(key)
+        if stale is None:
+            raise
+        print(f"[openf1] WARNING: refetch of {key} failed ({exc}); using the expired entry")
+        return stale
+
+
+def _fetch_openf1_drivers(season: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Return latest OpenF1 driver metadata keyed by driver_number.
+    Scoped to the season's race sessions when OpenF1 has them; otherwise the full
+    (unfiltered) dataset, cached once and shared by every season. Both cached with a TTL.
+    """
+    with span("openf1_drivers", season=season):
+        if season is not None:
+            try:
+                scoped = _openf1_cached(f"openf1_drivers_{season}", lambda: _fetch_openf1_season_drivers(season))
+                if scoped:
+                    return scoped
+            except Exception as exc:
+                print(f"[openf1] Failed season drivers {season}: {exc}")
+
+        return _openf1_cached("openf1_drivers", _fetch_openf1_all_drivers)
+
+
+@dataclass
+class RoundData:
+    """Uma rodada já normalizada, independente da fonte: a corrida e suas linhas (rodada x piloto)."""
+
+    round: int
+    race: Race
+    records: List[Dict[str, Any]]
+    source: str
+
+
+def _make_round(
+    season: int,
+    round_number: int,
+    info: Dict[str, Any],
+    results: List[RaceResult],
+    records: List[Dict[str, Any]],
+    source: str,
+) -> Optional[RoundData]:
+    if not results:
+        return None
+    results_sorted = sorted(results, key=lambda r: r.position)
+    fastest = min(
+        (r for r in results_sorted if r.avgLapTime),
+        key=lambda r: r.avgLapTime,
+        default=None,
+    )
+    fastest_str = f"{fastest.driver} - {fastest.avgLapTime}" if fastest else None
+    race = Race(
+        id=f"{season}-{round_number:02d}-{slugify(info['name'])}",
+        name=info["name"],
+        circuit=info["circuit"],
+        circuitId=info.get("circuitId"),
+        country=info.get("country"),
+        date=info["date"],
+        round=round_number,
+        results=results_sorted,
+        highlights=_race_highlights(results_sorted, fastest_str),
+        fastestLap=fastest_str,
+    )
+    return RoundData(round=round_number, race=race, records=records, source=source)
+
+
+def _result_record(
+    round_number: int,
+    result: RaceResult,
+    driver_number: Any,
+    open_meta: Dict[str, Any],
+    name: Optional[str],
+    short_name: Optional[str],
+    prefer_source: bool = False,
+) -> Dict[str, Any]:
+    """
+    Linha (rodada x piloto) do agregador. Nome/sigla do OpenF1 têm prioridade sobre os da
+    fonte, exceto com prefer_source (Ergast): aí o OpenF1 só preenche o que faltar.
+    """
+    if prefer_source:
+        name = name or open_meta.get("full_name")
+        short_name = short_name or open_meta.get("name_acronym")
+    else:
+        name = open_meta.get("full_name") or name
+        short_name = open_meta.get("name_acronym") or short_name
+    return {
+        "round": round_number,
+        "driverId": result.driverId,
+        "position": result.position,
+        "points": _safe_float(result.points, 0.0),
+        "team": result.team,
+        "driver_number": driver_number,
+        "name": name or None,
+        "shortName": short_name or None,
+        "teamColor": _normalize_hex_color(open_meta.get("team_colour"), default=None),
+        "country": open_meta.get("country_code") or None,
+        "photo": open_meta.get("headshot_url") or None,
+    }
+
+
+def _event_info(event: Any) -> Dict[str, Any]:
+    """Nome/circuito/país/data de um evento do calendário do FastF1."""
+    return {
+        "name": event.get("EventName") or event.get("OfficialEventName") or "Corrida",
+        "circuit": event.get("Location") or event.get("Circuit", "Circuito"),
+        "country": event.get("Country"),
+        "date": _safe_iso_date(event.get("EventDate")),
+    }
+
+
+def _round_from_fastf1(
+    season: int,
+    round_number: int,
+    info: Dict[str, Any],
+    classification: List[Dict[str, Any]],
+    openf1_lookup: Dict[str, Dict[str, Any]],
+) -> Optional[RoundData]:
+    results: List[RaceResult] = []
+    records: List[Dict[str, Any]] = []
+    for row in classification:
+        try:
+            result = _build_race_result(row, openf1_lookup)
+        except ValueError:
+            continue
+        results.append(result)
+
+        driver_number = row.get("DriverNumber") or None
+        open_meta = (openf1_lookup.get(str(driver_number)) if driver_number else None) or {}
+        records.append(
+            _result_record(
+                round_number,
+                result,
+                driver_number,
+                open_meta,
+                name=row.get("FullName"),
+                short_name=row.get("Abbreviation") or row.get("BroadcastName"),
             )
+        )
+    return _make_round(season, round_number, info, results, records, source="fastf1")
 
-    drivers: List[Driver] = []
-    for driver_id, stats in driver_stats.items():
-        positions = stats["positions"]
-        avg_pos = sum(positions) / len(positions) if positions else 0
-        top10 = len([p for p in positions if p <= 10]) if positions else 0
-        consistency = round((top10 / len(positions)) * 100) if positions else 0
-        team_color = _normalize_hex_color(stats["teamColor"])
 
-        ordered = sorted(stats["points_by_round"].items())  # [(round, points), ...]
-        points_history = [pts for _, pts in ordered]
+def _round_from_ergast(
+    season: int,
+    race_data: Optional[Dict[str, Any]],
+    openf1_lookup: Dict[str, Dict[str, Any]],
+    info: Optional[Dict[str, Any]] = None,
+) -> Optional[RoundData]:
+    """
+    Normalize one Ergast race. With `info` (the FastF1 calendar entry) the race keeps
+    the same name/id it would have had from FastF1, so ids stay stable across sources.
+    """
+    if not race_data:
+        return None
+    round_number = _safe_int(race_data.get("round"), 0)
+    if round_number <= 0:
+        return None
+    circuit = race_data.get("Circuit", {}) or {}
+    if info is None:
+        info = {
+            "name": race_data.get("raceName") or "Corrida",
+            "circuit": circuit.get("circuitName", "Circuito"),
+            "country": circuit.get("Location", {}).get("country"),
+            "date": race_data.get("date") or "",
+        }
+    info = {**info, "circuitId": circuit.get("circuitId") or info.get("circuitId")}
+
+    results: List[RaceResult] = []
+    records: List[Dict[str, Any]] = []
+    for res in race_data.get("Results", []):
+        pos = _safe_int(res.get("position"), 0)
+        if pos <= 0:
+            continue
+        driver_info = res.get("Driver", {}) or {}
+        constructor = res.get("Constructor", {}) or {}
+        driver_id = (driver_info.get("code") or driver_info.get("driverId") or "").lower()
+        driver_number = driver_info.get("permanentNumber")
+
+        grid = _safe_int(res.get("grid"), None)
+        fastest_lap = ((res.get("FastestLap") or {}).get("Time") or {}).get("time")
+        result = RaceResult(
+            position=pos,
+            driverId=driver_id,
+            driver=f"{driver_info.get('givenName', '')} {driver_info.get('familyName', '')}".strip() or driver_info.get("driverId", ""),
+            team=constructor.get("name") or "Desconhecido",
+            gridPosition=grid,
+            positionChange=grid - pos if grid is not None else 0,
+            points=_safe_float(res.get("points"), 0.0),
+            avgLapTime=fastest_lap,
+        )
+        results.append(result)
+
+        open_meta = (openf1_lookup.get(str(driver_number)) if driver_number else None) or {}
+        records.append(
+            _result_record(
+                round_number,
+                result,
+                driver_number,
+                open_meta,
+                name=result.driver,
+                short_name=driver_info.get("code") or driver_info.get("driverId"),
+                prefer_source=True,
+            )
+        )
+    return _make_round(season, round_number, info, results, records, source="ergast")
+
+
+_RESULT_COLUMNS = [
+    "round",
+    "driverId",
+    "position",
+    "points",
+    "team",
+    "driver_number",
+    "name",
+    "shortName",
+    "teamColor",
+    "country",
+    "photo",
+]
+_DRIVER_META_COLUMNS = ["team", "driver_number", "name", "shortName", "teamColor", "country", "photo"]
+
+
+def _aggregate_season(
+    records: List[Dict[str, Any]],
+    openf1_lookup: Dict[str, Dict[str, Any]],
+) -> Tuple[List[Driver], str]:
+    """
+    Columnar season aggregation: one row per (round, driver) classification.
+    Points, wins, podiums, avg position, top-10 rate, history, last-8 window and
+    trend come from group-bys. Driver metadata keeps the last non-null value per
+    driver, whatever source each round came from.
+    Returns (drivers sorted by points, dominant team).
+    """
+    if not records:
+        return [], "N/A"
+
+    df = pd.DataFrame.from_records(records, columns=_RESULT_COLUMNS)
+    df["win"] = df["position"] == 1
+    df["podium"] = df["position"] <= 3
+    df["top10"] = df["position"] <= 10
+
+    # sort=False: pilotos na ordem em que aparecem (desempate estável do ranking)
+    by_driver = df.groupby("driverId", sort=False)
+    stats = by_driver.agg(
+        points=("points", "sum"),
+        wins=("win", "sum"),
+        podiums=("podium", "sum"),
+        avg_position=("position", "mean"),
+        starts=("position", "size"),
+        top10=("top10", "sum"),
+    )
+    meta = by_driver[_DRIVER_META_COLUMNS].last()
+
+    # pointsHistory / lastRaces: pontos por rodada em ordem de rodada
+    by_round = df.sort_values("round", kind="stable")
+    history_groups = by_round.groupby("driverId", sort=False)
+    history = history_groups["points"].agg(list)
+    season_avg = history_groups["points"].mean()
+    recent_avg = by_round.groupby("driverId", sort=False).tail(3).groupby("driverId", sort=False)["points"].mean()
+    last8 = by_round.groupby("driverId", sort=False).tail(8).groupby("driverId", sort=False)
+    last8_points = last8["points"].agg(list)
+    last8_rounds = last8["round"].agg(list)
+
+    # tendência: média das 3 últimas vs média da temporada (±2 pts); estável com < 3 corridas
+    # (np.select é posicional: tudo alinhado ao índice de stats antes)
+    history_len = history_groups["points"].size().reindex(stats.index)
+    delta = (recent_avg - season_avg).reindex(stats.index)
+    trend = pd.Series(
+        np.select([history_len < 3, delta > 2, delta < -2], ["stable", "up", "down"], default="stable"),
+        index=stats.index,
+    )
 
-        last8 = ordered[-8:]
-        last_races = [pts for _, pts in last8]
-        last_rounds = [rnd for rnd, _ in last8]
+    drivers: List[Driver] = []
+    for driver_id, row in stats.iterrows():
+        info = meta.loc[driver_id]
+        team_color = _normalize_hex_color(_none_if_na(info["teamColor"]) or "#71717a")
+        # proteção extra: se vier algo estranho
+        if not team_color or ":" in str(team_color):
+            open_meta = openf1_lookup.get(str(_none_if_na(info["driver_number"]) or ""))
+            team_color = _normalize_hex_color(open_meta.get("team_colour") if open_meta else None)
 
+        starts = int(row["starts"])
         drivers.append(
             Driver(
                 id=driver_id,
-                name=stats["name"] or driver_id.upper(),
-                shortName=stats["shortName"] or driver_id.upper(),
-                team=stats["team"] or "Desconhecido",
+                name=_none_if_na(info["name"]) or driver_id.upper(),
+                shortName=_none_if_na(info["shortName"]) or driver_id.upper(),
+                team=_none_if_na(info["team"]) or "Desconhecido",
                 teamColor=team_color,
-                country=stats["country"],
-                points=round(stats["points"], 1),
-                wins=stats["wins"],
-                podiums=stats["podiums"],
-                avgPosition=round(avg_pos, 2),
-                consistency=consistency,
-                trend=_trend_from_points(points_history),
-                pointsHistory=points_history,
-                lastRaces=last_races,
-                lastRacesRounds=last_rounds,
-                photo=stats["photo"],
+                country=_none_if_na(info["country"]),
+                points=round(_safe_float(row["points"], 0.0), 1),
+                wins=int(row["wins"]),
+                podiums=int(row["podiums"]),
+                avgPosition=round(float(row["avg_position"]), 2) if starts else 0.0,
+                consistency=round((int(row["top10"]) / starts) * 100) if starts else 0,
+                trend=str(trend[driver_id]),
+                pointsHistory=[float(p) for p in history[driver_id]],
+                lastRaces=[float(p) for p in last8_points[driver_id]],
+                lastRacesRounds=[int(r) for r in last8_rounds[driver_id]],
+                photo=_none_if_na(info["photo"]),
             )
         )
 
+    team_points = df.groupby("team", sort=False)["points"].sum()
+    dominant_team = str(team_points.idxmax()) if not team_points.empty else "N/A"
 
     drivers_sorted = sorted(drivers, key=lambda d: d.points, reverse=True)
-    races_sorted = sorted(races, key=lambda r: r.round)
-    dominant_team = team_points.most_common(1)[0][0] if team_points else "N/A"
+    return drivers_sorted, dominant_team
 
-    return {
-        "drivers": drivers_sorted,
-        "races": races_sorted,
-        "dominant_team": dominant_team,
-    }
+
+def _none_if_na(value: Any) -> Any:
+    return None if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)) else value
+
+
+def _records_to_columns(records: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Layout colunar compacto para persistir as linhas no snapshot."""
+    return {col: [rec.get(col) for rec in records] for col in _RESULT_COLUMNS}
+
+
+def _columns_to_records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    size = len(columns.get("round", []))
+    return [{col: columns.get(col, [None] * size)[i] for col in _RESULT_COLUMNS} for i in range(size)]
 
 
 def _build_race_result(row: Dict[str, Any], openf1_lookup: Dict[str, Dict[str, Any]]) -> RaceResult:
@@ -495,220 +973,481 @@ def _build_race_result(row: Dict[str, Any], openf1_lookup: Dict[str, Dict[str, A
     )
 
 
-def _trend_from_points(points_history: List[float]) -> str:
-    if len(points_history) < 3:
-        return "stable"
-    recent = sum(points_history[-3:]) / 3
-    season_avg = sum(points_history) / len(points_history)
-    if recent - season_avg > 2:
-        return "up"
-    if season_avg - recent > 2:
-        return "down"
-    return "stable"
-
 def _hydrate_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
     # drivers
     snapshot["drivers"] = [Driver(**d) if isinstance(d, dict) else d for d in snapshot.get("drivers", [])]
     # races
     snapshot["races"] = [Race(**r) if isinstance(r, dict) else r for r in snapshot.get("races", [])]
+    # overview materializado no build (ausente em snapshots antigos ou sem pilotos)
+    if isinstance(snapshot.get("overview"), dict):
+        snapshot["overview"] = SeasonOverview(**snapshot["overview"])
+    # índice id -> corrida (uma vez por snapshot) + JSON por corrida serializado sob demanda
+    snapshot["race_index"] = {r.id: r for r in snapshot["races"]}
+    snapshot["race_json"] = {}
+    # momentos (epoch) a partir dos quais cada evento do calendário deve ter resultado
+    event_times = [_iso_to_epoch(value) for value in (snapshot.get("schedule") or {}).values()]
+    snapshot["event_times"] = sorted(t + EVENT_RESULTS_DELAY for t in event_times if t is not None)
     return snapshot
 
-def _season_snapshot(season: int) -> Dict[str, Any]:
-    snap = get_or_set_cache(
-        key=f"season_{season}",
-        builder_fn=lambda: _season_snapshot_compute(season),
-    )
-    return _hydrate_snapshot(snap)
 
-def _season_snapshot_compute(season: int) -> Dict[str, Any]:
+def _iso_to_epoch(value: Any) -> Optional[float]:
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _season_completed(season: int) -> bool:
+    return season < date.today().year
+
+
+def _season_is_stale(season: int, snapshot: Dict[str, Any], written_at: float) -> bool:
     """
-    Pre-compute season data (drivers + races) to serve to the frontend.
-    This runs in a threadpool when called by FastAPI (sync route).
+    Freshness policy. An event that finished after the snapshot was written makes it
+    stale (schedule-aware); the in-progress season also expires after CURRENT_SEASON_TTL.
+    Completed seasons written after their last event are cached forever.
     """
-    openf1_lookup = _fetch_openf1_drivers()
-    schedule = fastf1.get_event_schedule(season, include_testing=False)
-
-    races: List[Race] = []
-
-    driver_stats: Dict[str, Dict[str, Any]] = defaultdict(
-        lambda: {
-            "points": 0.0,
-            "wins": 0,
-            "podiums": 0,
-            "positions": [],
-            "points_by_round": {},  # round_number -> points
-            "team": None,
-            "teamColor": "#71717a",
-            "country": None,
-            "name": None,
-            "shortName": None,
-            "photo": None,
-            "driver_number": None,
-        }
-    )
+    now = time.time()
+    if any(written_at < event_time <= now for event_time in snapshot.get("event_times", [])):
+        return True
+    if _season_completed(season):
+        return False
+    return now - written_at > CURRENT_SEASON_TTL
+
+
+def _season_from_race_id(race_id: str) -> Optional[int]:
+    """O id da corrida é `{season}-{round:02d}-{slug}`; devolve a temporada ou None."""
+    head = race_id.split("-", 1)[0]
+    if len(head) != 4 or not head.isdigit():
+        return None
+    return int(head)
 
-    team_points: Counter[str] = Counter()
 
-    for _, event in schedule.iterrows():
-        round_number = _safe_int(event.get("RoundNumber"), 0)
-        if round_number <= 0:
-            continue
+def _race_json(snapshot: Dict[str, Any], race_id: str) -> Optional[bytes]:
+    cached = snapshot["race_json"].get(race_id)
+    if cached is not None:
+        return cached
+    race = snapshot["race_index"].get(race_id)
+    if race is None:
+        return None
+    body = _json_body(race)
+    snapshot["race_json"][race_id] = body
+    return body
 
-        event_name = event.get("EventName") or event.get("OfficialEventName") or "Corrida"
-        country = event.get("Country")
-        circuit = event.get("Location") or event.get("Circuit", "Circuito")
-        date = _safe_iso_date(event.get("EventDate"))
 
-        try:
-            session = fastf1.get_session(season, round_number, "R")
-            session.load(laps=False, telemetry=False)
-            classification = session.results.to_dict(orient="records")
-        except Exception as exc:
-            print(f"[fastf1] round {round_number} failed: {exc}")
-            continue
+def _json_body(value: Any) -> bytes:
+    """Mesmo JSON compacto que o JSONResponse do FastAPI produz."""
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
 
-        results: List[RaceResult] = []
 
-        for row in classification:
-            try:
-                result = _build_race_result(row, openf1_lookup)
-            except ValueError:
-                continue
+def _render_season_bodies(key: str, data: Dict[str, Any]) -> Dict[str, bytes]:
+    """
+    Bodies of /api/drivers, /api/races (whole season and the latest RACES_DEFAULT_LIMIT)
+    and /api/overview for a season snapshot, rendered once per write; utils.cache
+    stores them with gzip/brotli variants.
+    """
+    bodies = {"drivers": _json_body(data.get("drivers", []))}
+    # pelo modelo: snapshots gravados antes de um campo novo saem com o mesmo corpo da rota
+    races = [Race(**race) if isinstance(race, dict) else race for race in data.get("races", [])]
+    bodies["races"] = _json_body(races)
+    bodies["races_latest"] = _json_body(races[-RACES_DEFAULT_LIMIT:])
+    if data.get("overview") is not None:
+        bodies["overview"] = _json_body(data["overview"])
+    else:
+        snapshot = _hydrate_snapshot(dict(data))
+        if snapshot["drivers"] and snapshot["races"]:
+            bodies["overview"] = _json_body(_build_overview(snapshot, int(key.split("_", 1)[1])))
+    return bodies
 
-            results.append(result)
 
-            driver_id = result.driverId
-            stats = driver_stats[driver_id]
+register_renderer("season_", _render_season_bodies, version=RESPONSE_FORMAT_VERSION)
 
-            # --------- dados base ----------
-            points = _safe_float(result.points, 0.0)
 
-            stats["points"] += points
-            stats["wins"] += 1 if result.position == 1 else 0
-            stats["podiums"] += 1 if result.position <= 3 else 0
-            stats["positions"].append(result.position)
+def _index_season_snapshot(key: str, data: Dict[str, Any], digest: str) -> None:
+    results_store.index_season(int(key.split("_", 1)[1]), data, digest, slug=slugify)
 
-            # round -> points (serve para pointsHistory/lastRaces corretos)
-            stats["points_by_round"][round_number] = points
 
-            stats["team"] = result.team
-            stats["driver_number"] = row.get("DriverNumber") or stats["driver_number"]
-            stats["name"] = row.get("FullName") or stats["name"]
-            stats["shortName"] = row.get("Abbreviation") or row.get("BroadcastName") or stats["shortName"]
+def _ensure_indexed(season: int) -> None:
+    """Temporada em cache ainda fora do índice SQLite (ou indexada de outra versão do snapshot): indexa agora."""
+    key = f"season_{season}"
 
-            team_points[result.team] += points
+    def _index() -> None:
+        digest = content_hash(key)
+        if digest is None or results_store.indexed_hash(season) == digest:
+            return
+        data = read_cache(key)
+        if data is not None:
+            _index_season_snapshot(key, data, digest)
 
-            # --------- enriquecimento (OpenF1) ----------
-            driver_number = stats["driver_number"]
-            open_meta = openf1_lookup.get(str(driver_number)) if driver_number else None
+    single_flight(f"store:{key}", _index)
 
-            if open_meta:
-                stats["teamColor"] = _normalize_hex_color(
-                    open_meta.get("team_colour"),
-                    default=stats["teamColor"],
-                )
-                stats["country"] = open_meta.get("country_code") or stats["country"]
-                stats["photo"] = open_meta.get("headshot_url") or stats["photo"]
-                stats["name"] = open_meta.get("full_name") or stats["name"]
-                stats["shortName"] = open_meta.get("name_acronym") or stats["shortName"]
 
-        if not results:
-            continue
+if RESULTS_STORE_ENABLED:
+    # o índice acompanha cada gravação do snapshot (build, refresh, migração)
+    register_write_hook("season_", _index_season_snapshot)
+
+def _season_snapshot(season: int) -> Dict[str, Any]:
+    # snapshot hidratado fica em memória (LRU); o arquivo JSON só é lido no miss
+    # vencido pela política de frescor: serve o atual e atualiza em background (incremental)
+    return get_or_set_hydrated(
+        key=f"season_{season}",
+        builder_fn=lambda: _season_snapshot_compute(season),
+        hydrate_fn=_hydrate_snapshot,
+        is_stale=lambda snapshot, written_at: _season_is_stale(season, snapshot, written_at),
+        refresh_fn=lambda: _refresh_season_snapshot(season),
+    )
 
-        results_sorted = sorted(results, key=lambda r: r.position)
+def _refresh_season_snapshot(season: int) -> Dict[str, Any]:
+    """Rebuild the cached season incrementally: only rounds missing from the stored aggregates are loaded."""
+    key = f"season_{season}"
+    return refresh_cache(key, lambda: _season_snapshot_compute(season, previous=read_cache(key)))
 
-        fastest = min(
-            (r for r in results_sorted if r.avgLapTime),
-            key=lambda r: r.avgLapTime,
-            default=None,
-        )
-        fastest_str = f"{fastest.driver} - {fastest.avgLapTime}" if fastest else None
-
-        races.append(
-            Race(
-                id=f"{season}-{round_number:02d}-{slugify(event_name)}",
-                name=event_name,
-                circuit=circuit,
-                country=country,
-                date=date,
-                round=round_number,
-                results=results_sorted,
-                highlights=_race_highlights(results_sorted, fastest_str),
-                fastestLap=fastest_str,
-            )
+
+def _warm_season_snapshot(season: int) -> Optional[Dict[str, Any]]:
+    """Só o snapshot já hidratado em memória (mesmo stale-while-revalidate); nunca lê o disco."""
+    return peek_hydrated(
+        f"season_{season}",
+        is_stale=lambda snapshot, written_at: _season_is_stale(season, snapshot, written_at),
+        refresh_fn=lambda: _refresh_season_snapshot(season),
+    )
+
+
+class SeasonBuilding(Exception):
+    """O build frio ficou na fila do build_pool (ou passou de BUILD_WAIT_SECONDS): vira um 202."""
+
+    def __init__(self, season: int, state: str):
+        self.season = season
+        self.state = state
+
+
+@app.exception_handler(SeasonBuilding)
+async def _season_building_response(request: Request, exc: SeasonBuilding) -> JSONResponse:
+    return JSONResponse(
+        {"status": exc.state, "season": exc.season, "stream": f"/api/v1/seasons/{exc.season}/stream"},
+        status_code=202,
+        headers={"Retry-After": str(BUILD_RETRY_AFTER)},
+    )
+
+
+def _submit_build(key: str, fn) -> Tuple[Future, bool]:
+    try:
+        return build_pool.submit(key, fn)
+    except BuildQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Muitas temporadas sendo construídas; tente de novo em instantes.",
+            headers={"Retry-After": str(BUILD_RETRY_AFTER)},
         )
 
-    # --------- fallback ----------
-    if not races:
-        print(f"[snapshot] FastF1 não retornou corridas para {season}. Tentando Ergast...")
 
-        ergast_snapshot = _build_snapshot_from_ergast(season, openf1_lookup)
-        if ergast_snapshot.get("races"):
-            print(f"[snapshot] Ergast retornou {len(ergast_snapshot['races'])} corridas para {season}.")
-            return ergast_snapshot
+async def _await_build(season: int, key: str, fn) -> Any:
+    """
+    Roda fn no build_pool sem ocupar o threadpool dos requests: 503 com a fila cheia,
+    202 se o build ficou na fila ou passou de BUILD_WAIT_SECONDS; senão espera o resultado.
+    """
+    future, queued = _submit_build(key, fn)
+    if queued:
+        raise SeasonBuilding(season, "queued")
+    # asyncio.wait não cancela o build se o cliente desconectar (outros podem estar esperando)
+    waiter = asyncio.wrap_future(future)
+    done, _ = await asyncio.wait({waiter}, timeout=BUILD_WAIT_SECONDS or None)
+    if not done:
+        raise SeasonBuilding(season, "building")
+    return waiter.result()
+
+
+async def _season_snapshot_async(season: int) -> Dict[str, Any]:
+    """
+    _season_snapshot para as rotas async: hit em memória sai direto no event loop;
+    snapshot só em disco é lido e hidratado no threadpool; temporada sem cache é
+    construída no build_pool.
+    """
+    snapshot = _warm_season_snapshot(season)
+    if snapshot is not None:
+        return snapshot
+    key = f"season_{season}"
+    if is_cached(key):
+        return await run_in_threadpool(_season_snapshot, season)
+    return await _await_build(season, key, lambda: _season_snapshot(season))
+
+
+def _season_snapshot_bounded(season: int) -> Dict[str, Any]:
+    """_season_snapshot para código síncrono (streams): builds frios também passam pelo build_pool."""
+    key = f"season_{season}"
+    if memory_cache.contains(key) or is_cached(key):
+        return _season_snapshot(season)
+    future, _ = build_pool.submit(key, lambda: _season_snapshot(season))
+    return future.result()
+
+
+def _event_has_happened(event: Any) -> bool:
+    event_date = pd.to_datetime(event.get("EventDate"), errors="coerce")
+    if pd.isna(event_date):
+        return True  # sem data confiável: tenta carregar mesmo assim
+    return event_date <= pd.Timestamp.now()
+
+
+def _fastf1_rounds(
+    season: int,
+    events: List[Tuple[int, Dict[str, Any]]],
+    openf1_lookup: Dict[str, Dict[str, Any]],
+) -> Iterator[RoundData]:
+    """
+    FastF1 adapter with per-round Ergast fallback, yielding rounds in calendar order.
 
-        print(f"[snapshot] Ergast falhou/sem corridas. Usando OpenF1 (metadados apenas).")
-        return _build_snapshot_from_openf1_only(openf1_lookup)
+    Every session is submitted up front (process pool). A round whose load fails is
+    fetched from Ergast as soon as the failure is known; one still running after
+    ERGAST_HEDGE_AFTER gets a hedged Ergast request in parallel (first usable answer
+    wins, FastF1 preferred); past ROUND_DEADLINE the round is served from Ergast.
+    """
+    if not events:
+        return
+    executor, futures = submit_rounds(season, [rnd for rnd, _ in events], cache_dir=str(cache_dir.resolve()))
+    fallback_pool = ThreadPoolExecutor(max_workers=ergast.max_concurrency, thread_name_prefix="ergast-fallback")
+    fallbacks: Dict[int, Future] = {}
+    lock = threading.Lock()
+    closed = False
+
+    def _fallback(rnd: int, reason: str) -> Future:
+        with lock:
+            if rnd not in fallbacks:
+                ergast_fallbacks.inc(reason=reason)
+                fallbacks[rnd] = fallback_pool.submit(_fetch_ergast_round, season, rnd)
+            return fallbacks[rnd]
+
+    def _on_done(rnd: int, future: Future) -> None:
+        # falha no FastF1 já dispara o Ergast, sem esperar a vez da rodada no loop
+        if not closed and not future.cancelled() and future.exception() is not None:
+            _fallback(rnd, "failed")
+
+    for rnd, future in futures.items():
+        future.add_done_callback(lambda f, rnd=rnd: _on_done(rnd, f))
+
+    def _resolve(rnd: int, info: Dict[str, Any]) -> Optional[RoundData]:
+        primary = futures[rnd]
+        now = time.monotonic()
+        deadline = now + ROUND_DEADLINE
+        hedge_at = now + ERGAST_HEDGE_AFTER if ERGAST_HEDGE_AFTER > 0 else None
+        pending = {primary}
+        while pending:
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, until - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: f is not primary):
+                if future is primary:
+                    if future.exception() is not None:
+                        print(f"[fastf1] round {rnd} failed: {future.exception()}; usando Ergast")
+                        pending.add(_fallback(rnd, "failed"))
+                        hedge_at = None
+                        continue
+                    classification, load_seconds = future.result()
+                    observe_span("session_load", load_seconds, season=season, round=rnd)
+                    data = _round_from_fastf1(season, rnd, info, classification, openf1_lookup)
+                    if data is None:
+                        pending.add(_fallback(rnd, "empty"))
+                        hedge_at = None
+                else:
+                    data = _round_from_ergast(season, future.result(), openf1_lookup, info)
+                if data is not None:
+                    return data
+            if not done:
+                if time.monotonic() >= deadline:
+                    break
+                print(f"[fastf1] round {rnd} lento (>{ERGAST_HEDGE_AFTER:g}s); requisição paralela ao Ergast")
+                pending.add(_fallback(rnd, "hedge"))
+                hedge_at = None
+
+        # estourou o prazo: a rodada sai do Ergast (o tempo de espera é o timeout HTTP)
+        if not primary.done():
+            print(f"[fastf1] round {rnd} excedeu {ROUND_DEADLINE:g}s; usando Ergast")
+        return _round_from_ergast(season, _fallback(rnd, "deadline").result(), openf1_lookup, info)
 
-    # --------- build drivers ----------
-    drivers: List[Driver] = []
+    try:
+        for rnd, info in events:
+            data = _resolve(rnd, info)
+            if data is not None:
+                yield data
+    finally:
+        closed = True
+        executor.shutdown(wait=False, cancel_futures=True)
+        fallback_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _ergast_rounds(
+    season: int,
+    openf1_lookup: Dict[str, Dict[str, Any]],
+    skip: Iterable[int] = (),
+) -> Iterator[RoundData]:
+    """Ergast-only adapter (no FastF1 calendar): whole season, paginated; rounds in `skip` are left out."""
+    skip = set(skip)
+    # ceil(total/limit) requisições paginadas; rodada a rodada só se a paginação falhar
+    for race_data in _fetch_ergast_results(season) or _fetch_ergast_results_full(season):
+        if _safe_int(race_data.get("round"), 0) in skip:
+            continue
+        data = _round_from_ergast(season, race_data, openf1_lookup)
+        if data is not None:
+            yield data
 
-    for driver_id, stats in driver_stats.items():
-        positions = stats["positions"]
-        avg_position = (sum(positions) / len(positions)) if positions else 0.0
 
-        finishes = len([p for p in positions if p is not None])
-        consistency = 0
-        if finishes:
-            top10 = len([p for p in positions if p and p <= 10])
-            consistency = round((top10 / finishes) * 100)
+class _SeasonAggregator:
+    """
+    Streaming aggregator fed by every source adapter. Keeps one Race and the result
+    rows per round; can be seeded with the `aggregates` of a previous snapshot.
+    """
 
-        # pointsHistory (ordenado por round)
-        ordered = sorted(stats["points_by_round"].items())  # [(round, points), ...]
-        points_history = [pts for _, pts in ordered]
+    def __init__(self, season: int, openf1_lookup: Dict[str, Dict[str, Any]], previous: Optional[Dict[str, Any]] = None):
+        self.season = season
+        self.openf1_lookup = openf1_lookup
+        self.races: Dict[int, Race] = {}
+        self.records: List[Dict[str, Any]] = []  # uma linha por (rodada, piloto) classificado
+        self.sources: Dict[str, int] = {}
+
+        aggregates = (previous or {}).get("aggregates") or {}
+        if "results" in aggregates:
+            for race in previous.get("races", []):
+                race = Race(**race) if isinstance(race, dict) else race
+                self.races[race.round] = race
+            self.records = _columns_to_records(aggregates["results"])
+            self.seeded_rounds = {int(rnd) for rnd in aggregates.get("rounds", [])}
+        else:
+            self.seeded_rounds = set()  # snapshot antigo/sem linhas: build completo
+
+    @property
+    def rounds(self) -> set:
+        return self.seeded_rounds | set(self.races)
+
+    def add(self, data: RoundData) -> None:
+        if data.round in self.races:
+            self.records = [rec for rec in self.records if rec.get("round") != data.round]
+        self.races[data.round] = data.race
+        self.records.extend(data.records)
+        self.sources[data.source] = self.sources.get(data.source, 0) + 1
+
+    def standings(self) -> Tuple[List[Driver], str]:
+        return _aggregate_season(self.records, self.openf1_lookup)
+
+    def snapshot(self, schedule: Dict[str, str]) -> Dict[str, Any]:
+        drivers_sorted, dominant_team = self.standings()
+        return {
+            "drivers": drivers_sorted,
+            "races": [self.races[rnd] for rnd in sorted(self.races)],
+            "dominant_team": dominant_team,
+            # calendário completo: usado pela política de frescor (_season_is_stale)
+            "schedule": schedule,
+            # linhas (rodada x piloto) persistidas para o próximo build incremental
+            "aggregates": {
+                "results": _records_to_columns(self.records),
+                "rounds": sorted(self.rounds),
+            },
+        }
 
-        last8 = ordered[-8:]
-        last_races = [pts for _, pts in last8]
-        last_rounds = [rnd for rnd, _ in last8]
 
-        team_color = _normalize_hex_color(stats["teamColor"])
+def _season_snapshot_compute(season: int, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Pre-compute season data (drivers + races) to serve to the frontend.
+    This runs in a threadpool when called by FastAPI (sync route).
 
-        # proteção extra: se vier algo estranho
-        if not team_color or ":" in str(team_color):
-            open_meta = openf1_lookup.get(str(stats["driver_number"] or ""))
-            team_color = _normalize_hex_color(open_meta.get("team_colour") if open_meta else None)
+    Rounds come from the FastF1 adapter (with per-round Ergast fallback) or, without
+    a FastF1 calendar, from the Ergast adapter; both feed the same aggregator.
+    With `previous` (a cached snapshot carrying `aggregates`), the stored per-round
+    result rows are restored and only rounds not yet processed are loaded.
+    """
+    key = f"season_{season}"
+    # clientes de /api/v1/seasons/{season}/stream acompanham o build por este canal
+    channel, _ = build_progress.open(key)
+    try:
+        with span("season_build", season=season, incremental=previous is not None):
+            snapshot = _season_snapshot_stream(season, previous, channel)
+    except Exception as exc:
+        channel.publish("error", {"season": season, "detail": str(exc)})
+        raise
+    finally:
+        build_progress.close(key, channel)
+    return snapshot
 
-        drivers.append(
-            Driver(
-                id=driver_id,
-                name=stats["name"] or driver_id.upper(),
-                shortName=stats["shortName"] or driver_id.upper(),
-                team=stats["team"] or "Desconhecido",
-                teamColor=team_color,
-                country=stats["country"],
-                points=round(_safe_float(stats["points"], 0.0), 1),
-                wins=stats["wins"],
-                podiums=stats["podiums"],
-                avgPosition=round(avg_position, 2),
-                consistency=consistency,
-                trend=_trend_from_points(points_history),
-                pointsHistory=points_history,
-                lastRaces=last_races,
-                lastRacesRounds=last_rounds,
-                photo=stats["photo"],
-            )
-        )
 
-    drivers_sorted = sorted(drivers, key=lambda d: d.points, reverse=True)
-    races_sorted = sorted(races, key=lambda r: r.round)
+def _season_snapshot_stream(
+    season: int,
+    previous: Optional[Dict[str, Any]],
+    channel: ProgressChannel,
+) -> Dict[str, Any]:
+    openf1_lookup = _fetch_openf1_drivers(season)
+    aggregator = _SeasonAggregator(season, openf1_lookup, previous)
+    processed_rounds = aggregator.rounds
+    for rnd in sorted(aggregator.races):
+        channel.publish("race", aggregator.races[rnd])
 
-    dominant_team = team_points.most_common(1)[0][0] if team_points else "N/A"
+    try:
+        with span("event_schedule", season=season):
+            schedule = fastf1.get_event_schedule(season, include_testing=False)
+    except Exception as exc:
+        print(f"[fastf1] Failed schedule {season}: {exc}. Tentando Ergast...")
+        schedule = None
+
+    event_dates: Dict[str, str] = {}
+    if schedule is not None:
+        events: List[Tuple[int, Dict[str, Any]]] = []
+        for _, event in schedule.iterrows():
+            round_number = _safe_int(event.get("RoundNumber"), 0)
+            if round_number <= 0:
+                continue
+            event_dates[str(round_number)] = _safe_iso_date(event.get("EventDate"))
+            if round_number in processed_rounds or not _event_has_happened(event):
+                continue
+            events.append((round_number, _event_info(event)))
+        events.sort(key=lambda item: item[0])
+        if events:
+            # mesmo id de circuito que as rodadas do Ergast: o índice por circuito não depende da fonte
+            circuit_ids = _fetch_ergast_circuit_ids(season)
+            events = [(rnd, {**info, "circuitId": circuit_ids.get(rnd)}) for rnd, info in events]
+        if processed_rounds:
+            print(f"[snapshot] {season}: {len(processed_rounds)} rodadas em cache, {len(events)} novas para carregar")
+        rounds = _fastf1_rounds(season, events, openf1_lookup)
+    else:
+        ergast_fallbacks.inc(reason="schedule")
+        rounds = _ergast_rounds(season, openf1_lookup, skip=processed_rounds)
 
-    return {
-        "drivers": drivers_sorted,
-        "races": races_sorted,
-        "dominant_team": dominant_team,
-    }
+    for data in rounds:
+        aggregator.add(data)
+        channel.publish("race", data.race)
+        # classificação parcial só se alguém está assistindo (custa uma agregação por rodada)
+        if channel.subscribers:
+            drivers, dominant_team = aggregator.standings()
+            channel.publish("standings", {"round": data.round, "drivers": drivers, "dominantTeam": dominant_team})
+
+    if aggregator.sources:
+        summary = ", ".join(f"{source}={count}" for source, count in sorted(aggregator.sources.items()))
+        print(f"[snapshot] {season}: {sum(aggregator.sources.values())} rodadas novas ({summary})")
+
+    # --------- fallback ----------
+    if not aggregator.races:
+        print(f"[snapshot] Nenhuma fonte retornou corridas para {season}. Usando OpenF1 (metadados apenas).")
+        snapshot = _build_snapshot_from_openf1_only(openf1_lookup)
+    else:
+        snapshot = aggregator.snapshot(event_dates)
+    # overview + leaderboards materializados junto de drivers/races (incremental também passa aqui)
+    if snapshot.get("drivers"):
+        snapshot["overview"] = _build_overview(snapshot, season)
+    _publish_final(channel, season, snapshot)
+    return snapshot
+
+
+def _publish_final(channel: ProgressChannel, season: int, snapshot: Dict[str, Any]) -> None:
+    races = snapshot.get("races", [])
+    channel.publish(
+        "standings",
+        {
+            "round": races[-1].round if races else 0,
+            "drivers": snapshot.get("drivers", []),
+            "dominantTeam": snapshot.get("dominant_team", "N/A"),
+        },
+    )
+    channel.publish(
+        "complete",
+        {"season": season, "racesCount": len(races), "dominantTeam": snapshot.get("dominant_team", "N/A")},
+    )
 
 
 def _build_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
@@ -732,6 +1471,8 @@ def _build_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
 
     winners: set[str] = set()
     podium_teams: set[str] = set()
+    # classificação de equipes no mesmo passe: team -> [pontos, vitórias, pódios]
+    team_totals: Dict[str, List[float]] = {}
 
     for r in races_with_results:
         # winner
@@ -743,6 +1484,10 @@ def _build_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
         for x in r.results:
             if x.position <= 3:
                 podium_teams.add(x.team)
+            totals = team_totals.setdefault(x.team, [0.0, 0, 0])
+            totals[0] += x.points
+            totals[1] += x.position == 1
+            totals[2] += x.position <= 3
 
     winners_count = len(winners)
     podium_teams_count = len(podium_teams)
@@ -755,8 +1500,27 @@ def _build_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
         recent = d.lastRaces[-3:] if d.lastRaces else []
         return (sum(recent) / len(recent)) if recent else 0.0
 
-    top_momentum = max(drivers, key=_recent_avg)
+    by_momentum = sorted(drivers, key=_recent_avg, reverse=True)  # estável: empate fica com o primeiro
+    top_momentum = by_momentum[0]
     falling_driver = min(drivers, key=_recent_avg)
+    momentum_leaders = [
+        LeaderboardEntry(id=d.id, name=d.name, team=d.team, teamColor=d.teamColor, value=round(_recent_avg(d), 2))
+        for d in by_momentum[:OVERVIEW_LEADERBOARD_SIZE]
+    ]
+
+    team_colors: Dict[str, str] = {}
+    for d in drivers:
+        team_colors.setdefault(d.team, d.teamColor)
+    team_standings = [
+        TeamStanding(
+            team=team,
+            teamColor=team_colors.get(team, "#71717a"),
+            points=round(points, 1),
+            wins=int(wins),
+            podiums=int(podiums),
+        )
+        for team, (points, wins, podiums) in sorted(team_totals.items(), key=lambda item: item[1][0], reverse=True)
+    ]
 
     highlights = [
         f"{leader.name} lidera o campeonato com {leader.points} pontos",
@@ -778,60 +1542,602 @@ def _build_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
         winnersCount=winners_count,
         podiumTeamsCount=podium_teams_count,
         totalRoundsInSeason=total_rounds_in_season,
+
+        momentumLeaders=momentum_leaders,
+        teamStandings=team_standings,
     )
 
 
+def _season_overview(snapshot: Dict[str, Any], season: int) -> SeasonOverview:
+    """Overview materializado no build; snapshots antigos (sem ele) calculam uma vez por hidratação."""
+    overview = snapshot.get("overview")
+    if overview is None:
+        overview = snapshot["overview"] = _build_overview(snapshot, season)
+    return overview
+
+
+
+def _pick_encoding(accept_encoding: Optional[str]) -> str:
+    """Melhor codificação pré-comprimida aceita pelo cliente (br > gzip), respeitando q=0."""
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            quality = _safe_float(params[2:], 0.0)
+        accepted[name] = quality
+    for encoding in BODY_ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _body_response(body: Optional[bytes], encoding: str) -> Optional[Response]:
+    if body is None:
+        return None
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _stored_body_async(request: Request, season: int, name: str) -> Optional[Response]:
+    """Corpo gravado junto do snapshot, na codificação negociada; sem serializar nem comprimir por request."""
+    encoding = _pick_encoding(request.headers.get("accept-encoding"))
+    key = f"season_{season}"
+    body = peek_body(key, name, encoding)
+    if body is None:
+        # fora da memória: leitura do disco (ou render de snapshot antigo) + hash no threadpool
+        body = await run_in_threadpool(read_body, key, name, encoding)
+    return _body_response(body, encoding)
+
+
+_NESTED_FIELDS = {Race: {"results": RaceResult}}
+
+
+def _parse_fields(fields: Optional[str], model: type) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    `fields=id,name,results.driver` mantém só esses campos; `fields=-pointsHistory,-results.avgLapTime`
+    remove campos. Vira (include, exclude) no formato de model_dump; 400 para campo desconhecido.
+    """
+    include: Dict[str, Any] = {}
+    exclude: Dict[str, Any] = {}
+    for token in (fields or "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        target = exclude if token.startswith("-") else include
+        name, _, sub = token.lstrip("-").partition(".")
+        if name not in model.model_fields:
+            raise HTTPException(status_code=400, detail=f"Campo desconhecido em fields: {name}")
+        if not sub:
+            target[name] = True
+            continue
+        nested = _NESTED_FIELDS.get(model, {}).get(name)
+        if nested is None or sub not in nested.model_fields:
+            raise HTTPException(status_code=400, detail=f"Campo desconhecido em fields: {name}.{sub}")
+        spec = target.get(name)
+        if spec is True:
+            continue
+        spec = spec or {"__all__": {}}
+        spec["__all__"][sub] = True
+        target[name] = spec
+    return include or None, exclude or None
+
+
+def _encode_cursor(state: Dict[str, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, int]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {key: int(value) for key, value in state.items()}
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+def _projected_response(
+    items: List[BaseModel],
+    fields: Optional[str],
+    model: type,
+    total: int,
+    next_cursor: Optional[str],
+) -> Response:
+    """Lista projetada direto dos modelos em memória, com headers de paginação."""
+    include, exclude = _parse_fields(fields, model)
+    payload = [item.model_dump(mode="json", include=include, exclude=exclude) for item in items]
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=_json_body(payload), media_type="application/json", headers=headers)
+
+
+async def _drivers_response(
+    request: Request,
+    season: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    snapshot = await _season_snapshot_async(season)
+    drivers: List[Driver] = snapshot["drivers"]
+    if limit is None and offset is None and cursor is None and fields is None:
+        return await _stored_body_async(request, season, "drivers") or drivers
+
+    # pilotos vêm ordenados por pontos: o cursor é a posição na lista
+    start = _decode_cursor(cursor).get("offset", 0) if cursor else (offset or 0)
+    end = len(drivers) if limit is None else start + limit
+    next_cursor = _encode_cursor({"offset": end}) if end < len(drivers) else None
+    return _projected_response(drivers[start:end], fields, Driver, len(drivers), next_cursor)
+
+
+async def _races_response(
+    request: Request,
+    season: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    top: Optional[int] = None,
+):
+    snapshot = await _season_snapshot_async(season)
+    races: List[Race] = snapshot["races"]
+    paginated = offset is not None or cursor is not None
+    if not paginated and fields is None and top is None:
+        # corpos pré-renderizados: a temporada inteira e as últimas RACES_DEFAULT_LIMIT
+        body_name = {None: "races", RACES_DEFAULT_LIMIT: "races_latest"}.get(limit)
+        if body_name is not None:
+            stored = await _stored_body_async(request, season, body_name)
+            if stored is not None:
+                return stored
+        return races if limit is None else races[-limit:]
+
+    if not paginated:
+        # sem offset/cursor, `limit` continua sendo "as últimas N corridas"
+        page = races[-limit:] if limit is not None else races
+        next_cursor = None
+    else:
+        # cursor = última rodada entregue: estável quando rodadas novas entram no snapshot
+        if cursor:
+            after = _decode_cursor(cursor).get("round", 0)
+            start = next((i for i, race in enumerate(races) if race.round > after), len(races))
+        else:
+            start = offset
+        end = len(races) if limit is None else start + limit
+        page = races[start:end]
+        next_cursor = _encode_cursor({"round": page[-1].round}) if page and end < len(races) else None
+
+    if top is not None:
+        page = [race.model_copy(update={"results": race.results[:top]}) for race in page]
+    return _projected_response(page, fields, Race, len(races), next_cursor)
+
 
 @app.get("/api/drivers", response_model=List[Driver])
-def get_drivers(season: int = Query(default=2024, ge=1950)) -> List[Driver]:
-    snapshot = _season_snapshot(season)
-    return snapshot["drivers"]
+async def get_drivers(
+    request: Request,
+    season: SeasonQuery = 2024,
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: Optional[int] = Query(default=None, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+) -> List[Driver]:
+    return await _drivers_response(request, season, limit, offset, cursor, fields)
 
 
 @app.get("/api/races", response_model=List[Race])
-def get_races(
-    season: int = Query(default=2024, ge=1950),
+async def get_races(
+    request: Request,
+    season: SeasonQuery = 2024,
     limit: Optional[int] = Query(default=None, ge=1, le=24),
+    offset: Optional[int] = Query(default=None, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    top: Optional[int] = Query(default=None, ge=0),
 ) -> List[Race]:
-    snapshot = _season_snapshot(season)
-    races: List[Race] = snapshot["races"]
-    if limit is not None:
-        return races[-limit:]
-    return races
+    return await _races_response(request, season, limit, offset, cursor, fields, top)
 
 
 @app.get("/api/races/{race_id}", response_model=Race)
-def get_race_detail(race_id: str, season: int = Query(default=2024, ge=1950)) -> Race:
-    snapshot = _season_snapshot(season)
-    for race in snapshot["races"]:
-        if race.id == race_id:
-            return race
-    raise HTTPException(status_code=404, detail="Corrida não encontrada")
+async def get_race_detail(
+    race_id: str,
+    season: Optional[int] = Query(default=None, ge=1950, le=LAST_SEASON),
+) -> Race:
+    # a temporada já vem no id; o parâmetro só vale para ids fora do padrão
+    from_id = _season_from_race_id(race_id)
+    if from_id is not None and not 1950 <= from_id <= LAST_SEASON:
+        # `0999-01-x`, `9999-...`: nenhuma temporada a ler nem a construir
+        raise HTTPException(status_code=404, detail="Corrida não encontrada")
+    season = from_id or season or 2024
+    key = f"season_{season}"
+    if not memory_cache.contains(key):
+        # temporada fria em memória: decodifica só esta corrida do snapshot binário
+        race = await run_in_threadpool(read_cache_item, key, "races", race_id)
+        if race is not None:
+            body = json.dumps(race, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            return Response(content=body, media_type="application/json")
+    snapshot = await _season_snapshot_async(season)
+    body = _race_json(snapshot, race_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Corrida não encontrada")
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/api/overview", response_model=SeasonOverview)
-def get_overview(season: int = Query(default=2024, ge=1950)) -> SeasonOverview:
-    snapshot = _season_snapshot(season)
-    return _build_overview(snapshot, season)
+async def get_overview(request: Request, season: SeasonQuery = 2024) -> SeasonOverview:
+    snapshot = await _season_snapshot_async(season)
+    return await _stored_body_async(request, season, "overview") or _season_overview(snapshot, season)
+
+
+@app.post("/api/v1/seasons/{season}/refresh")
+async def refresh_season(request: Request, season: SeasonPath) -> Dict[str, Any]:
+    """Pick up new rounds of a season without rebuilding it from round 1 (needs REFRESH_TOKEN)."""
+    if not REFRESH_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode("utf-8"), REFRESH_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token inválido", headers={"WWW-Authenticate": "Bearer"})
+    snapshot = await _await_build(season, f"refresh:season_{season}", lambda: _refresh_season_snapshot(season))
+    return {
+        "season": season,
+        "racesCount": len(snapshot.get("races", [])),
+        "rounds": snapshot.get("aggregates", {}).get("rounds", []),
+    }
+
+
+async def _indexed_season(season: int) -> None:
+    """
+    Garante a temporada no índice SQLite. Sem snapshot em disco, constrói como os outros
+    endpoints (202/503 com o build pool cheio); com snapshot, só indexa se ainda não estiver.
+    """
+    if not RESULTS_STORE_ENABLED:
+        raise HTTPException(status_code=404, detail="Índice de resultados desativado (RESULTS_STORE_ENABLED=0).")
+    if not is_cached(f"season_{season}"):
+        await _season_snapshot_async(season)
+    await run_in_threadpool(_ensure_indexed, season)
+
+
+@app.get("/api/v1/drivers/{driver_id}/results", response_model=List[DriverRaceResult])
+async def get_driver_results(driver_id: str, season: SeasonQuery = 2024) -> List[DriverRaceResult]:
+    """Resultados de um piloto na temporada, rodada a rodada, direto do índice SQLite."""
+    await _indexed_season(season)
+    results = await run_in_threadpool(results_store.driver_results, driver_id, season)
+    if not results:
+        raise HTTPException(status_code=404, detail="Piloto sem resultados nesta temporada")
+    return results
+
+
+@app.get("/api/v1/teams/{team_id}/standings", response_model=TeamProgression)
+async def get_team_standings(team_id: str, season: SeasonQuery = 2024) -> TeamProgression:
+    """Pontos e posição da equipe no campeonato de construtores depois de cada rodada."""
+    await _indexed_season(season)
+    rounds = await run_in_threadpool(results_store.team_progression, team_id, season)
+    if not rounds:
+        raise HTTPException(status_code=404, detail="Equipe sem resultados nesta temporada")
+    team = await run_in_threadpool(results_store.team_name, team_id)
+    return {"team": team["name"], "teamColor": team["color"], "season": season, "rounds": rounds}
+
+
+@app.get("/api/v1/circuits/{circuit_id}/results", response_model=List[CircuitRace])
+async def get_circuit_results(
+    circuit_id: str,
+    from_: Optional[int] = Query(default=None, alias="from", ge=1950, le=LAST_SEASON),
+    to: Optional[int] = Query(default=None, ge=1950, le=LAST_SEASON),
+    top: Optional[int] = Query(default=3, ge=1),
+) -> List[CircuitRace]:
+    """
+    Corridas num circuito em todas as temporadas em cache (ou entre `from` e `to`).
+    Temporadas sem snapshot não são construídas aqui.
+    """
+    if not RESULTS_STORE_ENABLED:
+        raise HTTPException(status_code=404, detail="Índice de resultados desativado (RESULTS_STORE_ENABLED=0).")
+    seasons = [s for s in _cached_seasons() if (from_ is None or s >= from_) and (to is None or s <= to)]
+    await run_in_threadpool(lambda: [_ensure_indexed(season) for season in seasons])
+    races = await run_in_threadpool(results_store.circuit_results, circuit_id, from_, to, top)
+    if not races:
+        raise HTTPException(status_code=404, detail="Nenhuma corrida nesse circuito")
+    return races
+
+
+_SEASON_INCLUDES = ("drivers", "races")
+
+
+def _ndjson(record: Dict[str, Any]) -> bytes:
+    return _json_body(record) + b"\n"
+
+
+def _season_records(snapshot: Dict[str, Any], season: int, include: Iterable[str]) -> Iterator[bytes]:
+    """Uma linha `season` (com os pilotos, se pedidos) e uma linha `race` por corrida."""
+    record: Dict[str, Any] = {
+        "type": "season",
+        "season": season,
+        "racesCount": len(snapshot.get("races", [])),
+        "dominantTeam": snapshot.get("dominant_team", "N/A"),
+    }
+    if "drivers" in include:
+        record["drivers"] = snapshot.get("drivers", [])
+    yield _ndjson(record)
+    if "races" in include:
+        prefix = b'{"type":"race","season":%d,"race":' % season
+        for race in snapshot.get("races", []):
+            # reaproveita o JSON por corrida já serializado no snapshot em memória
+            yield prefix + _race_json(snapshot, race.id) + b"}\n"
+
+
+async def _stream_seasons(seasons: List[int], include: List[str]) -> AsyncIterator[bytes]:
+    """
+    Resolve the seasons concurrently (at most SEASONS_STREAM_CONCURRENCY at a time)
+    and emit each one as soon as it is ready, in completion order. Only the seasons
+    in the window are held by the stream, whatever the size of the range.
+    Waits on the event loop: the builds run in the stream's own pool, never in the
+    shared threadpool the other endpoints use.
+    """
+    workers = max(1, min(SEASONS_STREAM_CONCURRENCY, len(seasons)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="seasons")
+    queue = iter(seasons)
+    pending: Dict["asyncio.Future[Dict[str, Any]]", int] = {}
+
+    def _submit_next() -> None:
+        season = next(queue, None)
+        if season is not None:
+            pending[asyncio.wrap_future(pool.submit(_season_snapshot_bounded, season))] = season
+
+    try:
+        for _ in range(workers):
+            _submit_next()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                season = pending.pop(future)
+                _submit_next()
+                try:
+                    snapshot = future.result()
+                except Exception as exc:
+                    print(f"[seasons] Failed season {season}: {exc}")
+                    yield _ndjson({"type": "error", "season": season, "detail": str(exc)})
+                    continue
+                for line in _season_records(snapshot, season, include):
+                    yield line
+    finally:
+        # cliente desconectou: temporadas ainda não iniciadas não são construídas
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.get("/api/v1/seasons")
+async def stream_seasons(
+    from_: int = Query(alias="from", ge=1950),
+    to: Optional[int] = Query(default=None, ge=1950),
+    include: str = Query(default="drivers,races"),
+) -> StreamingResponse:
+    """Várias temporadas de uma vez, em NDJSON: uma linha por temporada e uma por corrida."""
+    to = from_ if to is None else to
+    if to < from_:
+        raise HTTPException(status_code=400, detail="`to` deve ser maior ou igual a `from`.")
+    if to > LAST_SEASON:
+        raise HTTPException(status_code=400, detail="Temporada fora do intervalo disponível.")
+    parts = [part.strip() for part in include.split(",") if part.strip()]
+    unknown = [part for part in parts if part not in _SEASON_INCLUDES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"include inválido: {', '.join(unknown)}")
+
+    return StreamingResponse(
+        _stream_seasons(list(range(from_, to + 1)), parts),
+        media_type="application/x-ndjson",
+    )
+
+
+def _sse(event: str, data: Any) -> bytes:
+    body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {body}\n\n".encode("utf-8")
+
+
+def _replay_snapshot(channel: ProgressChannel, season: int, snapshot: Dict[str, Any]) -> None:
+    for race in snapshot.get("races", []):
+        channel.publish("race", race)
+    _publish_final(channel, season, snapshot)
+
+
+def _watch_season_build(season: int, channel: ProgressChannel, future: Future) -> None:
+    """
+    Done-callback of the build started by the first stream client of a season nobody
+    is building. The build itself publishes to `channel`; if the snapshot came from
+    cache instead, it is replayed into the channel so the waiting clients still get
+    every event.
+    """
+    key = f"season_{season}"
+    exc = future.exception()
+    if exc is not None:
+        print(f"[stream] Failed season {season}: {exc}")
+        channel.publish("error", {"season": season, "detail": str(exc)})
+    elif not channel.done:
+        _replay_snapshot(channel, season, future.result())
+    build_progress.close(key, channel)
+
+
+async def _follow_channel(channel: ProgressChannel) -> AsyncIterator[bytes]:
+    async for item in channel.follow():
+        if item is None:
+            yield b": keep-alive\n\n"
+            continue
+        yield _sse(*item)
+
+
+@app.get("/api/v1/seasons/{season}/stream")
+async def stream_season(season: SeasonPath) -> StreamingResponse:
+    """
+    Server-Sent Events da temporada: um `race` por rodada assim que ela é processada,
+    `standings` com a classificação parcial e um `complete` no fim. Se a temporada
+    está sendo construída, o cliente se junta ao build em andamento (com replay do que
+    já saiu); sem build e sem cache, dispara um único build compartilhado.
+    """
+    key = f"season_{season}"
+    channel = build_progress.get(key)
+    if channel is None and (memory_cache.contains(key) or is_cached(key)):
+        # já pronta: replay direto do snapshot, sem canal
+        channel = ProgressChannel()
+        _replay_snapshot(channel, season, await _season_snapshot_async(season))
+        channel.close()
+    elif channel is None:
+        channel, created = build_progress.open(key)
+        if created:
+            try:
+                future, _ = _submit_build(key, lambda: _season_snapshot(season))
+            except HTTPException:
+                build_progress.close(key, channel)
+                raise
+            future.add_done_callback(lambda f: _watch_season_build(season, channel, f))
+
+    return StreamingResponse(
+        _follow_channel(channel),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/healthz")
-def healthcheck():
+async def healthcheck():
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de texto do Prometheus."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/readyz")
+async def readiness():
+    """503 until the startup prewarm has finished; per-season warm/cold/building state."""
+    seasons = sorted(set(_cached_seasons()) | set(PREWARM_SEASONS))
+    ready = _prewarm_state["done"]
+    body = {
+        "status": "ready" if ready else "warming",
+        "seasons": {str(season): _season_state(season) for season in seasons},
+        "errors": _prewarm_state["errors"],
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+async def _season_etag(endpoint: str, season: int, params: Dict[str, Any]) -> Optional[str]:
+    """ETag forte por (endpoint, temporada, parâmetros), derivada do hash do snapshot em disco."""
+    key = f"season_{season}"
+    # memo fresco sai direto; stat/leitura/sha256 do arquivo vão para o threadpool
+    digest = peek_content_hash(key) or await run_in_threadpool(content_hash, key)
+    if digest is None:
+        return None
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    raw = f"{endpoint}|{season}|{query}|{digest}|v{RESPONSE_FORMAT_VERSION}"
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):  # If-None-Match usa comparação fraca
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    """Cada codificação é uma representação diferente: ETag própria (`"<hash>-br"`)."""
+    return etag if encoding == "identity" else f'{etag[:-1]}-{encoding}"'
+
+
+def _cache_control(season: int) -> str:
+    if _season_completed(season):
+        return f"public, max-age={PAST_SEASON_MAX_AGE}, immutable"
+    return f"public, max-age={CURRENT_SEASON_MAX_AGE}, must-revalidate"
+
+
+async def _conditional_get(
+    request: Request,
+    response: Response,
+    endpoint: str,
+    season: int,
+    params: Dict[str, Any],
+    produce,
+):
+    """
+    Responde 304 se o If-None-Match bater, sem hidratar o snapshot nem serializar o corpo.
+    Caso contrário chama produce() e anexa ETag/Cache-Control à resposta.
+    """
+    cache_control = _cache_control(season)
+    etag = await _season_etag(endpoint, season, params)
+    if_none_match = request.headers.get("if-none-match")
+    if etag is not None:
+        encoding = _pick_encoding(request.headers.get("accept-encoding"))
+        for candidate in (_encoded_etag(etag, encoding), etag):
+            if _etag_matches(if_none_match, candidate):
+                return Response(
+                    status_code=304,
+                    headers={"ETag": candidate, "Cache-Control": cache_control, "Vary": "Accept-Encoding"},
+                )
+
+    result = await produce()
+    # cache frio: o hash só existe depois do build
+    etag = etag or await _season_etag(endpoint, season, params)
+    # corpo pré-comprimido já é um Response: os headers vão nele, não no `response` injetado
+    target = result if isinstance(result, Response) else response
+    if etag is not None:
+        target.headers["ETag"] = _encoded_etag(etag, target.headers.get("content-encoding") or "identity")
+    target.headers["Cache-Control"] = cache_control
+    return result
+
+
 @app.get("/api/v1/overview", response_model=SeasonOverview)
-def get_overview_v1(season: int = Query(default=2024, ge=1950)) -> SeasonOverview:
-    return get_overview(season)
+async def get_overview_v1(
+    request: Request,
+    response: Response,
+    season: SeasonQuery = 2024,
+) -> SeasonOverview:
+    return await _conditional_get(request, response, "overview", season, {}, lambda: get_overview(request, season))
 
 
 @app.get("/api/v1/drivers", response_model=List[Driver])
-def get_drivers_v1(season: int = Query(default=2024, ge=1950)) -> List[Driver]:
-    return get_drivers(season)
+async def get_drivers_v1(
+    request: Request,
+    response: Response,
+    season: SeasonQuery = 2024,
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: Optional[int] = Query(default=None, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+) -> List[Driver]:
+    params = {"limit": limit, "offset": offset, "cursor": cursor, "fields": fields}
+    return await _conditional_get(
+        request,
+        response,
+        "drivers",
+        season,
+        {k: v for k, v in params.items() if v is not None},
+        lambda: _drivers_response(request, season, limit, offset, cursor, fields),
+    )
 
 @app.get("/api/v1/races", response_model=List[Race])
-def get_races_v1(
-    season: int = Query(default=2024, ge=1950),
-    limit: Optional[int] = Query(default=10, ge=1, le=24),
+async def get_races_v1(
+    request: Request,
+    response: Response,
+    season: SeasonQuery = 2024,
+    limit: Optional[int] = Query(default=RACES_DEFAULT_LIMIT, ge=1, le=24),
+    offset: Optional[int] = Query(default=None, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    top: Optional[int] = Query(default=None, ge=0),
 ) -> List[Race]:
-    return get_races(season, limit)
-
+    params = {"limit": limit, "offset": offset, "cursor": cursor, "fields": fields, "top": top}
+    return await _conditional_get(
+        request,
+        response,
+        "races",
+        season,
+        {k: v for k, v in params.items() if v is not None},
+        lambda: _races_response(request, season, limit, offset, cursor, fields, top),
+    )
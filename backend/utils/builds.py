@@ -0,0 +1,89 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.metrics import CallbackMetric
+
+# Builds frios (FastF1/Ergast, minutos) rodando ao mesmo tempo, e quantos podem esperar na fila
+BUILD_WORKERS = int(os.getenv("BUILD_WORKERS", "2"))
+BUILD_QUEUE_MAX = int(os.getenv("BUILD_QUEUE_MAX", "4"))
+
+
+class BuildQueueFull(Exception):
+    """Todos os workers ocupados e a fila cheia: o build não foi aceito."""
+
+
+class _Job:
+    def __init__(self) -> None:
+        self.future: Optional[Future] = None
+        self.started = False
+
+
+class BuildPool:
+    """
+    Executor dedicado e limitado para builds frios, separado do threadpool que atende
+    os requests: um burst de temporadas sem cache não prende as threads dos hits.
+    Um job por chave; pedidos repetidos da mesma chave se juntam ao mesmo future.
+    """
+
+    def __init__(self, workers: int = BUILD_WORKERS, max_queue: int = BUILD_QUEUE_MAX):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="build")
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[], Any]) -> Tuple[Future, bool]:
+        """
+        (future, na_fila): na_fila é True se o build ainda espera um worker livre.
+        Levanta BuildQueueFull se a chave não tem build e não cabe mais nenhum.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job.future, not job.started
+            if len(self._jobs) >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise BuildQueueFull(f"fila de builds cheia ({key})")
+            queued = len(self._jobs) >= self.workers
+            job = self._jobs[key] = _Job()
+            job.future = self._executor.submit(self._run, key, job, fn)
+            return job.future, queued
+
+    def _run(self, key: str, job: _Job, fn: Callable[[], Any]) -> Any:
+        job.started = True
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._jobs.pop(key, None)
+
+    def state(self, key: str) -> Optional[str]:
+        """Estado do build da chave: "running", "queued" ou None (nenhum)."""
+        job = self._jobs.get(key)
+        if job is None:
+            return None
+        return "running" if job.started else "queued"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.started)
+            return {"running": running, "queued": len(self._jobs) - running, "rejected": self.rejected}
+
+
+build_pool = BuildPool()
+
+CallbackMetric(
+    "f1_build_pool_jobs",
+    "Builds frios no executor dedicado, por estado.",
+    lambda: [((state,), value) for state, value in build_pool.stats().items() if state != "rejected"],
+    ["state"],
+)
+CallbackMetric(
+    "f1_build_pool_rejected_total",
+    "Builds recusados com a fila cheia (503).",
+    lambda: [((), build_pool.rejected)],
+    kind="counter",
+)
@@ -1,37 +1,496 @@
+import gzip
+import hashlib
 import json
+import mmap
+import os
 import pathlib
-from typing import Any, Dict, Optional
-from threading import Lock
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from threading import Event, Lock
 
 from fastapi.encoders import jsonable_encoder  # ✅
 
+from utils.metrics import CallbackMetric, span
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: só o single-flight dentro do processo
+    fcntl = None
+
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
-CACHE_DIR = BASE_DIR / "cache"
-CACHE_DIR.mkdir(exist_ok=True)
+# Snapshots e corpos pré-comprimidos (padrão backend/cache; o harness de carga usa um diretório temporário)
+CACHE_DIR = pathlib.Path(os.getenv("SNAPSHOT_CACHE_DIR", str(BASE_DIR / "cache")))
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Formato em disco: "msgpack" (binário com índice, lido via mmap) ou "json" (texto, legado)
+SNAPSHOT_CODEC = os.getenv("SNAPSHOT_CODEC", "msgpack")
+
+# Tier em memória (snapshots já hidratados). 0 = sem limite de bytes.
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "8"))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", "0"))
+# Intervalo mínimo entre checagens de mtime do arquivo (evita stat() a cada request)
+MEMORY_CACHE_REVALIDATE_SECONDS = float(os.getenv("MEMORY_CACHE_REVALIDATE_SECONDS", "2"))
+# Depois de um refresh em background falhar, espera isso antes de tentar de novo
+BACKGROUND_REFRESH_RETRY_SECONDS = float(os.getenv("BACKGROUND_REFRESH_RETRY_SECONDS", "300"))
+
+# Corpos de resposta pré-renderizados/comprimidos: cache/bodies/<chave>/<nome>.<hash>v<versão>.json[.gz|.br]
+BODIES_DIR = CACHE_DIR / "bodies"
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "11"))
+
+# Lock por chave entre processos (vários workers do uvicorn no mesmo CACHE_DIR): quem
+# espera o build de outro worker checa o lock a cada POLL; um dono travado há mais de
+# WAIT é ignorado e o build segue sem lock
+LOCKS_DIR = CACHE_DIR / "locks"
+CACHE_LOCK_POLL_SECONDS = float(os.getenv("CACHE_LOCK_POLL_SECONDS", "0.5"))
+CACHE_LOCK_WAIT_SECONDS = float(os.getenv("CACHE_LOCK_WAIT_SECONDS", "900"))
+
+class JsonCodec:
+    """Formato original: um JSON por entrada, lido e parseado inteiro."""
+
+    name = "json"
+    ext = ".json"
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def read(self, path: pathlib.Path) -> Dict[str, Any]:
+        return json.loads(path.read_bytes())
+
+    def read_item(self, path: pathlib.Path, section: str, item_id: str) -> Optional[Dict[str, Any]]:
+        return None  # sem índice: quem chama usa o caminho completo
+
+
+class MsgpackCodec:
+    """
+    Binário compacto, lido via mmap sem copiar o arquivo:
+
+        MAGIC(4) | versão(u16) | tamanho do cabeçalho(u32) | cabeçalho | corpo
+
+    O cabeçalho (msgpack) guarda, para cada chave de topo, o offset/tamanho no corpo.
+    Listas têm cada item codificado separadamente (e um índice por "id"), então uma
+    única corrida pode ser decodificada sem tocar no resto da temporada.
+    Versão diferente de FORMAT_VERSION é tratada como entrada ausente (rebuild/migração).
+    """
+
+    name = "msgpack"
+    ext = ".f1snap"
+    MAGIC = b"F1SN"
+    FORMAT_VERSION = 1
+    _prefix = struct.Struct("<4sHI")
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        sections: Dict[str, List[int]] = {}
+        items: Dict[str, List[List[int]]] = {}
+        ids: Dict[str, Dict[str, int]] = {}
+        body = bytearray()
+        for name, value in data.items():
+            if isinstance(value, list):
+                spans = []
+                for item in value:
+                    chunk = msgpack.packb(item, use_bin_type=True)
+                    spans.append([len(body), len(chunk)])
+                    body += chunk
+                items[name] = spans
+                item_ids = {
+                    item["id"]: i
+                    for i, item in enumerate(value)
+                    if isinstance(item, dict) and isinstance(item.get("id"), str)
+                }
+                if item_ids:
+                    ids[name] = item_ids
+            else:
+                chunk = msgpack.packb(value, use_bin_type=True)
+                sections[name] = [len(body), len(chunk)]
+                body += chunk
+
+        header = msgpack.packb(
+            {"order": list(data.keys()), "sections": sections, "items": items, "ids": ids},
+            use_bin_type=True,
+        )
+        return self._prefix.pack(self.MAGIC, self.FORMAT_VERSION, len(header)) + header + bytes(body)
+
+    def _header(self, buf: memoryview) -> Tuple[Dict[str, Any], int]:
+        if len(buf) < self._prefix.size:
+            raise ValueError("snapshot truncado")
+        magic, version, header_len = self._prefix.unpack_from(buf, 0)
+        if magic != self.MAGIC or version != self.FORMAT_VERSION:
+            raise ValueError(f"formato desconhecido (versão {version})")
+        start = self._prefix.size
+        header = msgpack.unpackb(buf[start:start + header_len], raw=False)
+        return header, start + header_len
+
+    @staticmethod
+    def _unpack(buf: memoryview, base: int, span: List[int]) -> Any:
+        offset, length = span
+        return msgpack.unpackb(buf[base + offset:base + offset + length], raw=False, strict_map_key=False)
+
+    def _with_buffer(self, path: pathlib.Path, fn: Callable[[memoryview], Any]) -> Any:
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return fn(view)
+            finally:
+                view.release()
+
+    def decode(self, buf: memoryview) -> Dict[str, Any]:
+        header, base = self._header(buf)
+        out: Dict[str, Any] = {}
+        for name in header["order"]:
+            if name in header["sections"]:
+                out[name] = self._unpack(buf, base, header["sections"][name])
+            else:
+                out[name] = [self._unpack(buf, base, span) for span in header["items"].get(name, [])]
+        return out
+
+    def read(self, path: pathlib.Path) -> Dict[str, Any]:
+        return self._with_buffer(path, self.decode)
+
+    def read_item(self, path: pathlib.Path, section: str, item_id: str) -> Optional[Dict[str, Any]]:
+        def _item(buf: memoryview) -> Optional[Dict[str, Any]]:
+            header, base = self._header(buf)
+            index = header["ids"].get(section, {}).get(item_id)
+            if index is None:
+                return None
+            return self._unpack(buf, base, header["items"][section][index])
+
+        return self._with_buffer(path, _item)
+
+
+_json_codec = JsonCodec()
+if SNAPSHOT_CODEC == "msgpack" and msgpack is None:
+    print("[cache] msgpack não instalado; usando snapshots em JSON")
+codec = MsgpackCodec() if SNAPSHOT_CODEC == "msgpack" and msgpack is not None else _json_codec
+
+
+# contadores por camada, aproximados e sem lock como os do MemoryCache:
+# (tier, hit|miss) -> leituras e (tier, read|write) -> bytes
+_tier_requests: Dict[Tuple[str, str], int] = {}
+_tier_bytes: Dict[Tuple[str, str], int] = {}
+
+
+def _count(tier: str, result: str, nbytes: int = 0, op: str = "read") -> None:
+    _tier_requests[(tier, result)] = _tier_requests.get((tier, result), 0) + 1
+    if nbytes:
+        _tier_bytes[(tier, op)] = _tier_bytes.get((tier, op), 0) + nbytes
+
+
+def _count_written(tier: str, nbytes: int) -> None:
+    _tier_bytes[(tier, "write")] = _tier_bytes.get((tier, "write"), 0) + nbytes
+
+
+def _atomic_write(path: pathlib.Path, payload: bytes, mtime: Optional[float] = None) -> None:
+    """Grava num temporário único (pid + thread) e troca com os.replace: ninguém lê meio arquivo."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(payload)
+        if mtime is not None:
+            os.utime(tmp, (mtime, mtime))
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+_lock_waits: Dict[str, int] = {}
+
+
+@contextmanager
+def _key_lock(key: str) -> Iterator[bool]:
+    """
+    Lock exclusivo da chave entre processos: flock em cache/locks/<chave>.lock.
+    O kernel solta o lock se o dono morrer, então não há lease para expirar.
+    Rende True se precisou esperar outro processo (a entrada pode ter mudado).
+    """
+    if fcntl is None:
+        yield False
+        return
+    LOCKS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCKS_DIR / f"{key}.lock", "a") as fh:
+        waited, locked = False, False
+        deadline = time.monotonic() + CACHE_LOCK_WAIT_SECONDS
+        while True:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                pass
+            if not waited:
+                waited = True
+                print(f"[cache] WAIT {key} → build em outro processo")
+            if time.monotonic() >= deadline:
+                print(f"[cache] lock de {key} preso há {CACHE_LOCK_WAIT_SECONDS:.0f}s; seguindo sem ele")
+                break
+            time.sleep(CACHE_LOCK_POLL_SECONDS)
+        if waited:
+            result = "acquired" if locked else "timeout"
+            _lock_waits[result] = _lock_waits.get(result, 0) + 1
+        try:
+            yield waited
+        finally:
+            if locked:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _try_key_lock(key: str) -> Iterator[bool]:
+    """_key_lock sem esperar: rende False se outro processo (ou outra thread, outro fd) segura a chave."""
+    if fcntl is None:
+        yield True
+        return
+    LOCKS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCKS_DIR / f"{key}.lock", "a") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _locked_elsewhere(key: str) -> bool:
+    """Outro processo segura o lock da chave (sem criar o arquivo de lock)."""
+    if fcntl is None:
+        return False
+    try:
+        fh = open(LOCKS_DIR / f"{key}.lock", "r")
+    except OSError:
+        return False
+    with fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(fh, fcntl.LOCK_UN)
+        return False
 
-_lock = Lock()
 
 def _path(key: str) -> pathlib.Path:
-    return CACHE_DIR / f"{key}.json"
+    return CACHE_DIR / f"{key}{codec.ext}"
+
+def _legacy_path(key: str) -> pathlib.Path:
+    return CACHE_DIR / f"{key}{_json_codec.ext}"
+
+def _meta_path(key: str) -> pathlib.Path:
+    # metadados ao lado da entrada (hash do conteúdo, mtime do arquivo de dados)
+    return CACHE_DIR / f"{key}.meta.json"
+
+def _stat(key: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, tamanho em bytes) do arquivo de cache, ou None se não existir."""
+    try:
+        st = _path(key).stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def is_cached(key: str) -> bool:
+    """Há entrada em disco para a chave (formato atual ou JSON legado), sem lê-la."""
+    return _path(key).exists() or _legacy_path(key).exists()
+
+
+def cached_keys(prefix: str = "") -> List[str]:
+    """Chaves com entrada em disco, em qualquer formato (sem os .meta.json)."""
+    keys = set()
+    for ext in {codec.ext, _json_codec.ext}:
+        keys.update(
+            path.name[: -len(ext)]
+            for path in CACHE_DIR.glob(f"{prefix}*{ext}")
+            if not path.name.endswith(".meta.json")
+        )
+    return sorted(keys)
 
-def read_cache(key: str) -> Optional[Dict[str, Any]]:
+def _migrate_legacy(key: str) -> None:
+    """Converte key.json para o formato atual quando o JSON é mais novo que o binário (ou ele não existe)."""
+    legacy = _legacy_path(key)
+    try:
+        legacy_mtime = legacy.stat().st_mtime
+    except OSError:
+        return
+    path = _path(key)
+    if path.exists() and path.stat().st_mtime >= legacy_mtime:
+        return
+    try:
+        data = _json_codec.read(legacy)
+    except Exception as exc:
+        print(f"[cache] migração de {key} falhou: {exc}")
+        return
+    # preserva o mtime: TTLs e a política de frescor continuam valendo a partir do build original
+    write_cache(key, data, mtime=legacy_mtime)
+    print(f"[cache] MIGRATE {key} json → {codec.name}")
+
+def read_cache(key: str, ttl: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    if codec is not _json_codec:
+        _migrate_legacy(key)
     path = _path(key)
-    if not path.exists():
+    try:
+        stat = path.stat()
+    except OSError:
+        _count("disk", "miss")
+        return None
+    # entrada mais velha que o TTL conta como ausente (o arquivo é reescrito no próximo build)
+    if ttl is not None and time.time() - stat.st_mtime > ttl:
+        _count("disk", "miss")
         return None
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        data = codec.read(path)
     except Exception:
+        _count("disk", "miss")
         return None
+    _count("disk", "hit", stat.st_size)
+    return data
 
-def write_cache(key: str, data: Dict[str, Any]) -> None:
+def read_cache_item(key: str, section: str, item_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Lê um único item (ex.: uma corrida por id) sem decodificar a entrada inteira.
+    None se a entrada/item não existir ou se o formato atual não tiver índice (JSON).
+    """
+    if codec is not _json_codec:
+        _migrate_legacy(key)
     path = _path(key)
-    tmp = path.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-    tmp.replace(path)
+    try:
+        item = codec.read_item(path, section, item_id) if path.exists() else None
+    except Exception:
+        item = None
+    _count("disk_item", "hit" if item is not None else "miss")
+    return item
+
+def _write_meta(key: str, digest: str) -> None:
+    stat = _stat(key)
+    if stat is None:
+        return
+    meta = {"hash": digest, "mtime_ns": stat[0], "size": stat[1]}
+    _atomic_write(_meta_path(key), json.dumps(meta).encode("utf-8"))
+
+def _read_meta(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(_meta_path(key).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+def write_cache(key: str, data: Dict[str, Any], mtime: Optional[float] = None) -> None:
+    payload = codec.encode(data)
+    _atomic_write(_path(key), payload, mtime=mtime)
+    _count_written("disk", len(payload))
+    digest = hashlib.sha256(payload).hexdigest()
+    _write_meta(key, digest)
+    _write_bodies(key, data, digest)
+    _run_write_hooks(key, data, digest)
+
+
+# key -> (mtime_ns, hash, última checagem)
+_hashes: Dict[str, Tuple[int, str, float]] = {}
+
+def content_hash(key: str) -> Optional[str]:
+    """
+    Hash (sha256) dos bytes da entrada, sem decodificá-la.
+    Vem do .meta.json quando ele bate com o mtime do arquivo; senão é recalculado e regravado.
+    """
+    now = time.monotonic()
+    memo = _hashes.get(key)
+    if memo is not None and now - memo[2] < MEMORY_CACHE_REVALIDATE_SECONDS:
+        return memo[1]
+
+    stat = _stat(key)
+    if stat is None:
+        _hashes.pop(key, None)
+        return None
+    if memo is not None and memo[0] == stat[0]:
+        _hashes[key] = (memo[0], memo[1], now)
+        return memo[1]
+
+    meta = _read_meta(key)
+    if meta and meta.get("mtime_ns") == stat[0] and meta.get("hash"):
+        digest = meta["hash"]
+    else:
+        try:
+            digest = hashlib.sha256(_path(key).read_bytes()).hexdigest()
+        except OSError:
+            return None
+        _write_meta(key, digest)
+    _hashes[key] = (stat[0], digest, now)
+    return digest
+
+
+def peek_content_hash(key: str) -> Optional[str]:
+    """content_hash só do memo ainda fresco (None se precisar de stat/leitura): seguro no event loop."""
+    memo = _hashes.get(key)
+    if memo is not None and time.monotonic() - memo[2] < MEMORY_CACHE_REVALIDATE_SECONDS:
+        return memo[1]
+    return None
+
+class _Flight:
+    """Um build em andamento para uma chave; quem chega depois espera o mesmo resultado."""
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = Lock()  # protege só o dicionário, nunca o build
+
+
+def single_flight(key: str, fn: Callable[[], Any]) -> Any:
+    """
+    Executa fn() uma única vez por chave entre chamadas concorrentes.
+    Chaves diferentes rodam em paralelo. Se o build falhar, quem estava
+    esperando recebe o mesmo erro e a chave é liberada (a falha não fica em cache).
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _flights[key] = flight
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = fn()
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+    return flight.result
+
 
-def get_or_set_cache(key: str, builder_fn) -> Dict[str, Any]:
-    with _lock:
-        cached = read_cache(key)
+def in_flight(key: str) -> bool:
+    """Build da chave em andamento neste processo ou em outro worker."""
+    return key in _flights or _locked_elsewhere(key)
+
+
+def _build_and_store(key: str, builder_fn, ttl: Optional[float] = None) -> Dict[str, Any]:
+    # um build por chave entre todos os workers; os outros esperam e leem o arquivo dele
+    with _key_lock(key):
+        # outro líder (thread ou worker) pode ter gravado o arquivo entre o HIT falho e o lock
+        cached = read_cache(key, ttl)
         if cached is not None:
             print(f"[cache] HIT {key}")
             return cached
@@ -44,3 +503,476 @@ def get_or_set_cache(key: str, builder_fn) -> Dict[str, Any]:
 
         write_cache(key, data)
         return data
+
+
+def get_or_set_cache(key: str, builder_fn, ttl: Optional[float] = None) -> Dict[str, Any]:
+    # HIT não pega lock nenhum; só o MISS entra no single-flight da chave
+    cached = read_cache(key, ttl)
+    if cached is not None:
+        print(f"[cache] HIT {key}")
+        return cached
+    return single_flight(key, lambda: _build_and_store(key, builder_fn, ttl))
+
+
+def refresh_cache(key: str, builder_fn) -> Dict[str, Any]:
+    """
+    Reconstrói e regrava a entrada mesmo que ela exista (ex.: temporada em andamento).
+    Compartilha o single-flight da chave com get_or_set_cache.
+    """
+    def _rebuild() -> Dict[str, Any]:
+        before = _stat(key)
+        with _key_lock(key) as waited:
+            if waited and _stat(key) != before:
+                # outro worker acabou de regravar a entrada: vale o refresh dele
+                data = read_cache(key)
+                if data is not None:
+                    print(f"[cache] HIT {key} (refresh de outro processo)")
+                    memory_cache.invalidate(key)
+                    return data
+            print(f"[cache] REFRESH {key}")
+            data = jsonable_encoder(builder_fn())
+            write_cache(key, data)
+            memory_cache.invalidate(key)
+            return data
+
+    return single_flight(key, _rebuild)
+
+
+# br só com o pacote `brotli`; a ordem é a preferência na negociação
+BODY_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+_BODY_SUFFIXES = {"identity": ".json", "gzip": ".json.gz", "br": ".json.br"}
+
+# (prefixo de chave, render(key, data) -> {nome: corpo JSON}, versão do formato dos corpos)
+_renderers: List[Tuple[str, Callable[[str, Dict[str, Any]], Dict[str, bytes]], str]] = []
+# key -> tag (hash + versão) cujos corpos já foram gerados (ou tentados) neste processo
+_rendered: Dict[str, str] = {}
+
+
+def register_renderer(
+    prefix: str,
+    render_fn: Callable[[str, Dict[str, Any]], Dict[str, bytes]],
+    version: str = "1",
+) -> None:
+    """
+    Registra quem gera os corpos de resposta das chaves com esse prefixo a cada gravação.
+    Mudou o formato dos corpos sem mudar o snapshot? Suba `version` e eles são regerados.
+    """
+    _renderers.append((prefix, render_fn, version))
+
+
+def _renderer(key: str) -> Optional[Tuple[Callable[[str, Dict[str, Any]], Dict[str, bytes]], str]]:
+    return next(((fn, version) for prefix, fn, version in _renderers if key.startswith(prefix)), None)
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+def _body_path(key: str, name: str, tag: str, encoding: str) -> pathlib.Path:
+    return BODIES_DIR / key / f"{name}.{tag}{_BODY_SUFFIXES[encoding]}"
+
+
+def _write_bodies(key: str, data: Dict[str, Any], digest: str) -> None:
+    """Renderiza os corpos da entrada e grava identity + variantes comprimidas; apaga as de hashes antigos."""
+    renderer = _renderer(key)
+    if renderer is None:
+        return
+    render, version = renderer
+    tag = f"{digest[:16]}v{version}"
+    _rendered[key] = tag
+    try:
+        with span("render_bodies", key=key):
+            bodies = render(key, data)
+    except Exception as exc:
+        print(f"[cache] render de {key} falhou: {exc}")
+        return
+
+    keep = set()
+    for name, body in bodies.items():
+        for encoding in ("identity",) + BODY_ENCODINGS:
+            path = _body_path(key, name, tag, encoding)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            encoded = _compress(body, encoding)
+            _atomic_write(path, encoded)
+            _count_written("bodies", len(encoded))
+            keep.add(path.name)
+    for old in (BODIES_DIR / key).glob("*"):
+        # temporários são de outra thread gravando agora
+        if old.name not in keep and not old.name.endswith(".tmp"):
+            old.unlink(missing_ok=True)
+
+
+# (prefixo de chave, hook(key, data, digest)): derivados da entrada atualizados a cada gravação
+_write_hooks: List[Tuple[str, Callable[[str, Dict[str, Any], str], None]]] = []
+
+
+def register_write_hook(prefix: str, hook: Callable[[str, Dict[str, Any], str], None]) -> None:
+    """Registra quem atualiza um derivado da entrada (ex.: um índice) sempre que uma chave com esse prefixo é gravada."""
+    _write_hooks.append((prefix, hook))
+
+
+def _run_write_hooks(key: str, data: Dict[str, Any], digest: str) -> None:
+    for prefix, hook in _write_hooks:
+        if key.startswith(prefix):
+            try:
+                hook(key, data, digest)
+            except Exception as exc:
+                # derivado desatualizado não derruba a gravação: a entrada continua valendo
+                print(f"[cache] hook de {key} falhou: {exc}")
+
+
+def _body_slot(key: str, name: str, encoding: str, digest: str) -> Optional[Tuple[str, ...]]:
+    renderer = _renderer(key)
+    if renderer is None:
+        return None
+    return ("body", name, f"{digest[:16]}v{renderer[1]}", encoding)
+
+
+def peek_body(key: str, name: str, encoding: str = "identity") -> Optional[bytes]:
+    """
+    Só o tier em memória de read_body: o corpo guardado junto do snapshot hidratado, ou None.
+    Não lê nem faz hash de arquivo; seguro no event loop (no None, read_body no threadpool).
+    """
+    digest = peek_content_hash(key)
+    slot = _body_slot(key, name, encoding, digest) if digest is not None else None
+    body = memory_cache.attached(key, slot) if slot is not None else None
+    if body is not None:
+        _count("memory_bodies", "hit")
+    return body
+
+
+def read_body(key: str, name: str, encoding: str = "identity") -> Optional[bytes]:
+    """
+    Corpo pré-renderizado `name` da versão atual da entrada, já na codificação pedida.
+    Entradas gravadas antes de existir o renderer ganham os corpos na primeira leitura.
+    None se não houver entrada ou o renderer não produzir esse corpo.
+    """
+    digest = content_hash(key)
+    slot = _body_slot(key, name, encoding, digest) if digest is not None else None
+    if slot is None:
+        return None
+    tag = slot[2]
+    body = memory_cache.attached(key, slot)
+    if body is not None:
+        _count("memory_bodies", "hit")
+        return body
+    path = _body_path(key, name, tag, encoding)
+    try:
+        body = path.read_bytes()
+        _count("bodies", "hit", len(body))
+        # próximos requests da temporada quente saem da memória, junto do snapshot hidratado
+        memory_cache.attach(key, slot, body)
+        return body
+    except FileNotFoundError:
+        pass
+    _count("bodies", "miss")
+    if _rendered.get(key) == tag:
+        return None
+
+    def _render_existing() -> Optional[bytes]:
+        # mesmo lock dos builds: não apaga corpos de um snapshot que outro worker acabou de gravar
+        with _try_key_lock(key) as locked:
+            if not locked:
+                # build/refresh da chave em andamento (segura o lock pela duração dele):
+                # corpo só em memória, sem esperar; ele grava os corpos da versão nova
+                return _render_unlocked(key, slot, digest)
+            if not path.exists():
+                data = read_cache(key)
+                _hashes.pop(key, None)  # o memo pode ser de antes da gravação de outro worker
+                if data is not None and content_hash(key) == digest:
+                    _write_bodies(key, data, digest)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    return single_flight(f"bodies:{key}:{name}:{encoding}", _render_existing)
+
+
+def _render_unlocked(key: str, slot: Tuple[str, ...], digest: str) -> Optional[bytes]:
+    """Renderiza um corpo direto da entrada atual, sem gravar em disco; fica no tier em memória."""
+    _, name, _, encoding = slot
+    data = read_cache(key)
+    renderer = _renderer(key)
+    if data is None or renderer is None or content_hash(key) != digest:
+        return None
+    try:
+        with span("render_bodies", key=key, stored=False):
+            body = renderer[0](key, data).get(name)
+    except Exception as exc:
+        print(f"[cache] render de {key} falhou: {exc}")
+        return None
+    if body is None:
+        return None
+    body = _compress(body, encoding)
+    memory_cache.attach(key, slot, body)
+    return body
+
+
+@dataclass
+class _MemoryEntry:
+    value: Any
+    mtime_ns: int
+    size: int
+    checked_at: float
+    # derivados da mesma versão do arquivo (ex.: corpos renderizados), descartados com a entrada
+    attached: Dict[Tuple[str, ...], bytes] = field(default_factory=dict)
+
+
+class MemoryCache:
+    """
+    LRU em memória na frente do cache em disco.
+    Guarda o valor já hidratado e o invalida quando o mtime do arquivo muda.
+    O tamanho de cada entrada é o tamanho do JSON em disco (aproximação barata).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0, revalidate_seconds: float = 2.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        # contadores aproximados (sem lock no caminho de leitura)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[_MemoryEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if now - entry.checked_at >= self.revalidate_seconds:
+            stat = _stat(key)
+            if stat is None or stat[0] != entry.mtime_ns:
+                self.invalidate(key)
+                self.misses += 1
+                return None
+            entry.checked_at = now
+
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:  # removida por outra thread no meio do caminho
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, value: Any, mtime_ns: int, size: int) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if self.max_bytes and size > self.max_bytes:
+                return  # nunca caberia; não vale expulsar todo o resto
+            self._entries[key] = _MemoryEntry(value, mtime_ns, size, time.monotonic())
+            self._bytes += size
+            self._shrink()
+
+    def _shrink(self) -> None:
+        # chamado com o lock; expulsa do mais antigo até caber nos limites
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def contains(self, key: str) -> bool:
+        return key in self._entries
+
+    def attached(self, key: str, slot: Tuple[str, ...]) -> Optional[bytes]:
+        """Derivado guardado junto da entrada (sem revalidar nem mexer no LRU)."""
+        entry = self._entries.get(key)
+        return entry.attached.get(slot) if entry is not None else None
+
+    def attach(self, key: str, slot: Tuple[str, ...], data: bytes) -> None:
+        """Guarda um derivado junto da entrada, se ela estiver em memória; conta no orçamento de bytes."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or slot in entry.attached:
+                return
+            if self.max_bytes and entry.size + len(data) > self.max_bytes:
+                return
+            entry.attached[slot] = data
+            entry.size += len(data)
+            self._bytes += len(data)
+            self._entries.move_to_end(key)
+            self._shrink()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+memory_cache = MemoryCache(
+    max_entries=MEMORY_CACHE_MAX_ENTRIES,
+    max_bytes=MEMORY_CACHE_MAX_BYTES,
+    revalidate_seconds=MEMORY_CACHE_REVALIDATE_SECONDS,
+)
+
+
+def _requests_samples():
+    samples = [((tier, result), value) for (tier, result), value in sorted(_tier_requests.items())]
+    samples += [(("memory", "hit"), memory_cache.hits), (("memory", "miss"), memory_cache.misses)]
+    return samples
+
+
+CallbackMetric(
+    "f1_cache_requests_total",
+    "Leituras por camada do cache (memory, disk, disk_item, bodies) e resultado.",
+    _requests_samples,
+    ["tier", "result"],
+    kind="counter",
+)
+CallbackMetric(
+    "f1_cache_bytes_total",
+    "Bytes lidos/gravados por camada do cache.",
+    lambda: sorted(_tier_bytes.items()),
+    ["tier", "op"],
+    kind="counter",
+)
+CallbackMetric("f1_memory_cache_entries", "Snapshots hidratados em memória.", lambda: [((), len(memory_cache._entries))])
+CallbackMetric("f1_memory_cache_bytes", "Bytes (tamanho em disco) dos snapshots em memória.", lambda: [((), memory_cache._bytes)])
+CallbackMetric(
+    "f1_memory_cache_evictions_total",
+    "Snapshots expulsos do LRU em memória.",
+    lambda: [((), memory_cache.evictions)],
+    kind="counter",
+)
+CallbackMetric(
+    "f1_cache_lock_waits_total",
+    "Builds que esperaram o lock da chave em outro processo (acquired) ou desistiram dele (timeout).",
+    lambda: [((result,), value) for result, value in list(_lock_waits.items())],
+    ["result"],
+    kind="counter",
+)
+
+
+_refreshing: Dict[str, float] = {}  # chave -> início do refresh em andamento
+_refresh_failed_at: Dict[str, float] = {}
+_refreshing_lock = Lock()
+
+
+def refresh_in_background(key: str, refresh_fn: Callable[[], Any]) -> bool:
+    """
+    Dispara refresh_fn() numa thread, no máximo um por chave ao mesmo tempo.
+    Depois de uma falha, novas tentativas esperam BACKGROUND_REFRESH_RETRY_SECONDS.
+    Devolve True se um refresh novo foi iniciado.
+    """
+    now = time.monotonic()
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        failed_at = _refresh_failed_at.get(key)
+        if failed_at is not None and now - failed_at < BACKGROUND_REFRESH_RETRY_SECONDS:
+            return False
+        _refreshing[key] = now
+
+    def _run() -> None:
+        try:
+            refresh_fn()
+            _refresh_failed_at.pop(key, None)
+        except Exception as exc:
+            print(f"[cache] refresh em background de {key} falhou: {exc}")
+            _refresh_failed_at[key] = time.monotonic()
+        finally:
+            with _refreshing_lock:
+                _refreshing.pop(key, None)
+
+    threading.Thread(target=_run, name=f"refresh-{key}", daemon=True).start()
+    return True
+
+
+def get_or_set_hydrated(
+    key: str,
+    builder_fn,
+    hydrate_fn: Callable[[Dict[str, Any]], Any],
+    is_stale: Optional[Callable[[Any, float], bool]] = None,
+    refresh_fn: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """
+    Igual a get_or_set_cache, mas devolve o valor hidratado e o mantém em memória.
+    Requests quentes não fazem I/O de disco nem reconstroem modelos.
+
+    Stale-while-revalidate: se is_stale(valor, gravado_em_epoch) for verdadeiro, o valor
+    atual é devolvido na hora e refresh_fn() roda em background (um por chave).
+    """
+    value = peek_hydrated(key, is_stale, refresh_fn)
+    if value is not None:
+        return value
+
+    def _load() -> Tuple[Any, Optional[int]]:
+        # stat antes da leitura: se o arquivo mudar no meio, a próxima checagem invalida
+        stat = _stat(key)
+        data = get_or_set_cache(key, builder_fn)
+        if stat is None:
+            stat = _stat(key)
+
+        hydrated = hydrate_fn(data)
+        if stat is None:
+            return hydrated, None
+        memory_cache.put(key, hydrated, mtime_ns=stat[0], size=stat[1])
+        return hydrated, stat[0]
+
+    # misses concorrentes da mesma chave compartilham uma leitura + hidratação
+    value, mtime_ns = single_flight(f"memory:{key}", _load)
+    _revalidate(key, value, mtime_ns, is_stale, refresh_fn)
+    return value
+
+
+def peek_hydrated(
+    key: str,
+    is_stale: Optional[Callable[[Any, float], bool]] = None,
+    refresh_fn: Optional[Callable[[], Any]] = None,
+) -> Optional[Any]:
+    """
+    Só o tier em memória de get_or_set_hydrated: devolve o valor hidratado (com o mesmo
+    stale-while-revalidate) ou None, sem ler o disco nem construir. Seguro no event loop.
+    """
+    entry = memory_cache.get_entry(key)
+    if entry is None:
+        return None
+    _revalidate(key, entry.value, entry.mtime_ns, is_stale, refresh_fn)
+    return entry.value
+
+
+def _revalidate(
+    key: str,
+    value: Any,
+    mtime_ns: Optional[int],
+    is_stale: Optional[Callable[[Any, float], bool]],
+    refresh_fn: Optional[Callable[[], Any]],
+) -> None:
+    if is_stale is not None and refresh_fn is not None and mtime_ns is not None:
+        if is_stale(value, mtime_ns / 1e9):
+            refresh_in_background(key, refresh_fn)
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import httpx
+
+from utils.metrics import Counter, Histogram
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# HTTP/2 só se o pacote `h2` estiver instalado (httpx[http2])
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") not in ("0", "false", "False")
+try:
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - depende do ambiente
+    HTTP2_ENABLED = False
+
+
+upstream_seconds = Histogram(
+    "f1_upstream_request_seconds",
+    "Latência de cada GET a um serviço externo (sem a espera do rate limiter).",
+    ["upstream"],
+)
+upstream_errors = Counter(
+    "f1_upstream_errors_total",
+    "Falhas por serviço externo: status HTTP (429, 5xx...) ou classe da exceção de transporte.",
+    ["upstream", "kind"],
+)
+
+
+class RateLimiter:
+    """Token bucket simples e thread-safe: `rate` requisições por segundo, com rajada `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Upstream:
+    """
+    Um cliente httpx de vida longa (keep-alive, pool de conexões) por serviço externo,
+    com limite de concorrência e de taxa compartilhado por todos os fetchers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 30.0,
+        max_concurrency: int = 4,
+        rate_per_second: float = 0.0,
+        max_retries: int = 2,
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self._limiter = RateLimiter(rate_per_second)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        http2=HTTP2_ENABLED,
+                        limits=httpx.Limits(
+                            max_connections=self.max_concurrency * 2,
+                            max_keepalive_connections=self.max_concurrency,
+                        ),
+                    )
+        return self._client
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET + raise_for_status + json(), respeitando concorrência, taxa e Retry-After em 429."""
+        for attempt in range(self.max_retries + 1):
+            self._limiter.acquire()
+            with self._slots:
+                start = time.perf_counter()
+                try:
+                    resp = self.client.get(path, params=params)
+                except httpx.HTTPError as exc:
+                    upstream_errors.inc(upstream=self.name, kind=type(exc).__name__)
+                    raise
+                finally:
+                    upstream_seconds.observe(time.perf_counter() - start, upstream=self.name)
+            if resp.status_code >= 400:
+                upstream_errors.inc(upstream=self.name, kind=str(resp.status_code))
+            if resp.status_code == 429 and attempt < self.max_retries:
+                retry_after = _safe_retry_after(resp.headers.get("Retry-After"))
+                print(f"[{self.name}] 429 em {path}, tentando de novo em {retry_after:.1f}s")
+                time.sleep(retry_after)
+                continue
+            resp.raise_for_status()
+            return resp.json()
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """Aplica fn em paralelo (até max_concurrency) e devolve os resultados na ordem de entrada."""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    def close(self) -> None:
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+def _safe_retry_after(value: Optional[str], default: float = 1.0, cap: float = 30.0) -> float:
+    try:
+        return min(cap, max(0.0, float(value))) if value else default
+    except ValueError:
+        return default
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Sem eventos novos por esse tempo (s), follow() devolve None para o chamador mandar um keep-alive
+PROGRESS_KEEPALIVE_SECONDS = 15.0
+
+
+class ProgressChannel:
+    """
+    Log de eventos de um build em andamento, só de acréscimo. Quem se inscreve recebe
+    tudo desde o início (replay) e depois acompanha ao vivo até o canal fechar.
+    """
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+        self.done = False
+        self.subscribers = 0
+        self._cond = threading.Condition()
+        # um por inscrito: acorda o event loop dele (publish vem das threads do build)
+        self._wakers: List[Callable[[], None]] = []
+
+    def publish(self, event: str, data: Any) -> None:
+        with self._cond:
+            if self.done:
+                return
+            self.events.append((event, data))
+            self._wake()
+
+    def close(self) -> None:
+        with self._cond:
+            self.done = True
+            self._wake()
+
+    def _wake(self) -> None:
+        for wake in self._wakers:
+            try:
+                wake()
+            except RuntimeError:  # loop do inscrito já fechou
+                pass
+
+    async def follow(self, keepalive: float = PROGRESS_KEEPALIVE_SECONDS) -> AsyncIterator[Optional[Tuple[str, Any]]]:
+        """
+        Eventos em ordem; None quando nada chegou em `keepalive` segundos.
+        Espera no event loop (nenhuma thread presa por inscrito enquanto o build roda).
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(wakeup.set)
+
+        with self._cond:
+            self.subscribers += 1
+            self._wakers.append(wake)
+        try:
+            index = 0
+            while True:
+                wakeup.clear()  # antes de olhar o log: um publish daqui em diante acorda o wait
+                with self._cond:
+                    batch = self.events[index:]
+                    finished = self.done
+                index += len(batch)
+                for item in batch:
+                    yield item
+                if batch:
+                    continue
+                if finished:
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+                self._wakers.remove(wake)
+
+
+class ProgressRegistry:
+    """Um canal por chave enquanto o build dela está rodando."""
+
+    def __init__(self):
+        self._channels: Dict[str, ProgressChannel] = {}
+        self._lock = threading.Lock()
+
+    def open(self, key: str) -> Tuple[ProgressChannel, bool]:
+        """Canal da chave, criando se preciso. Devolve (canal, criado_agora)."""
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is not None:
+                return channel, False
+            channel = self._channels[key] = ProgressChannel()
+            return channel, True
+
+    def get(self, key: str) -> Optional[ProgressChannel]:
+        return self._channels.get(key)
+
+    def close(self, key: str, channel: ProgressChannel) -> None:
+        with self._lock:
+            if self._channels.get(key) is channel:
+                del self._channels[key]
+        channel.close()
+
+
+build_progress = ProgressRegistry()
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# Quantos processos carregam sessões do FastF1 em paralelo (1 = sequencial, sem pool)
+FASTF1_WORKERS = int(os.getenv("FASTF1_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Tempo máximo (s) para carregar uma rodada no worker
+FASTF1_ROUND_TIMEOUT = float(os.getenv("FASTF1_ROUND_TIMEOUT", "180"))
+
+
+def _init_worker(cache_dir: str) -> None:
+    # Cada processo habilita o mesmo diretório de cache do FastF1. Rodadas diferentes
+    # gravam em pastas diferentes; o cache HTTP é SQLite, que já serializa escritas.
+    import fastf1
+
+    fastf1.Cache.enable_cache(cache_dir)
+
+
+def _on_timeout(signum, frame):
+    raise TimeoutError("tempo limite da rodada excedido")
+
+
+def load_round_classification(season: int, round_number: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Carrega a corrida (sessão "R") e devolve a classificação como lista de dicts."""
+    import fastf1
+
+    # SIGALRM só existe em Unix e só pode ser armado na thread principal (caso dos workers)
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        session = fastf1.get_session(season, round_number, "R")
+        session.load(laps=False, telemetry=False)
+        return session.results.to_dict(orient="records")
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _load_round_timed(season: int, round_number: int, timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], float]:
+    # o tempo é medido no worker: no processo pai só se vê quando o future termina
+    start = time.perf_counter()
+    records = load_round_classification(season, round_number, timeout)
+    return records, time.perf_counter() - start
+
+
+def submit_rounds(
+    season: int,
+    rounds: List[int],
+    cache_dir: str,
+    workers: int = FASTF1_WORKERS,
+    timeout: float = FASTF1_ROUND_TIMEOUT,
+) -> Tuple[Executor, Dict[int, Future]]:
+    """
+    Dispara a carga de cada rodada e devolve (executor, {round: future}) na hora.
+    Cada future resolve para (classificação, segundos gastos no worker).
+    Com workers > 1 usa um pool de processos (spawn); com 1, uma única thread.
+    Quem chama consome os futures na ordem que quiser e faz
+    `executor.shutdown(wait=False, cancel_futures=True)` no fim.
+    """
+    workers = max(1, min(workers, len(rounds) or 1))
+    if workers == 1:
+        executor: Executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fastf1")
+    else:
+        # spawn: fork de um processo com threads (uvicorn) pode travar
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(cache_dir,),
+        )
+    futures = {rnd: executor.submit(_load_round_timed, season, rnd, timeout) for rnd in rounds}
+    return executor, futures
@@ -0,0 +1,305 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.cache import CACHE_DIR
+from utils.metrics import span
+
+# Índice SQLite dos resultados, derivado dos snapshots de temporada (que continuam
+# sendo a fonte da verdade): consultas estreitas sem desserializar temporadas inteiras
+RESULTS_STORE_ENABLED = os.getenv("RESULTS_STORE_ENABLED", "1") not in ("0", "false", "False")
+RESULTS_STORE_PATH = os.getenv("RESULTS_STORE_PATH", str(CACHE_DIR / "results.sqlite3"))
+
+# suba quando o esquema mudar: as tabelas são derivadas e são recriadas (e reindexadas) do zero
+_SCHEMA_VERSION = 2
+_DROP = """
+DROP TABLE IF EXISTS results;
+DROP TABLE IF EXISTS races;
+DROP TABLE IF EXISTS drivers;
+DROP TABLE IF EXISTS teams;
+DROP TABLE IF EXISTS seasons;
+"""
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasons (
+    season INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS drivers (
+    driver_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    short_name TEXT,
+    country TEXT,
+    photo TEXT,
+    last_season INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    color TEXT,
+    last_season INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS races (
+    race_id TEXT PRIMARY KEY,
+    season INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    circuit TEXT NOT NULL,
+    circuit_id TEXT NOT NULL,
+    country TEXT,
+    date TEXT,
+    fastest_lap TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS races_season_round ON races (season, round);
+CREATE INDEX IF NOT EXISTS races_circuit ON races (circuit_id, season);
+CREATE TABLE IF NOT EXISTS results (
+    race_id TEXT NOT NULL REFERENCES races (race_id) ON DELETE CASCADE,
+    season INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    driver_id TEXT NOT NULL,
+    team_id TEXT NOT NULL,
+    driver TEXT NOT NULL,
+    team TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    grid_position INTEGER,
+    position_change INTEGER NOT NULL DEFAULT 0,
+    points REAL NOT NULL DEFAULT 0,
+    avg_lap_time TEXT,
+    PRIMARY KEY (race_id, driver_id)
+);
+CREATE INDEX IF NOT EXISTS results_driver ON results (driver_id, season, round);
+CREATE INDEX IF NOT EXISTS results_team ON results (team_id, season, round);
+CREATE INDEX IF NOT EXISTS results_season ON results (season, round);
+"""
+
+
+class ResultsStore:
+    """
+    Tabelas normalizadas (temporadas, corridas, resultados, pilotos, equipes) com os
+    índices das consultas da API. Cada temporada é reindexada inteira, numa transação,
+    sempre que o snapshot dela é gravado; `seasons.content_hash` diz de qual versão do
+    snapshot ela veio. Uma conexão por thread; WAL para vários workers no mesmo arquivo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+                        conn.executescript(_DROP)
+                    conn.executescript(_SCHEMA)
+                    conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def indexed_hash(self, season: int) -> Optional[str]:
+        """Hash do snapshot de onde a temporada foi indexada (None = não indexada)."""
+        row = self._conn().execute("SELECT content_hash FROM seasons WHERE season = ?", (season,)).fetchone()
+        return row["content_hash"] if row else None
+
+    def seasons(self) -> List[int]:
+        return [row["season"] for row in self._conn().execute("SELECT season FROM seasons ORDER BY season")]
+
+    def index_season(
+        self,
+        season: int,
+        snapshot: Dict[str, Any],
+        content_hash: str,
+        slug: Callable[[str], str],
+    ) -> None:
+        """Substitui as linhas da temporada pelas do snapshot (formato JSON gravado no cache)."""
+        drivers = snapshot.get("drivers") or []
+        races = snapshot.get("races") or []
+        team_colors = {d.get("team"): d.get("teamColor") for d in drivers if d.get("team")}
+
+        race_rows, result_rows, teams = [], [], {}
+        for race in races:
+            # circuitId vem da fonte (igual para FastF1 e Ergast); snapshots antigos só têm o nome
+            race_rows.append((
+                race["id"], season, race["round"], race["name"], race["circuit"],
+                race.get("circuitId") or slug(race["circuit"]),
+                race.get("country"), race.get("date"), race.get("fastestLap"),
+            ))
+            for res in race.get("results") or []:
+                team_id = slug(res["team"])
+                teams[team_id] = res["team"]
+                # nome e equipe da própria linha: siglas se repetem entre épocas (MSC, VER...)
+                result_rows.append((
+                    race["id"], season, race["round"], res["driverId"], team_id, res["driver"], res["team"],
+                    res["position"],
+                    res.get("gridPosition"), res.get("positionChange") or 0, res.get("points") or 0,
+                    res.get("avgLapTime"),
+                ))
+        driver_rows = [
+            (d["id"], d.get("name") or d["id"], d.get("shortName"), d.get("country"), d.get("photo"), season)
+            for d in drivers
+        ]
+        team_rows = [(team_id, name, team_colors.get(name), season) for team_id, name in teams.items()]
+
+        with span("store_index", season=season), self._conn() as conn:
+            conn.execute("DELETE FROM races WHERE season = ?", (season,))
+            conn.executemany("INSERT INTO races VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", race_rows)
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", result_rows)
+            # metadados ficam com a temporada mais recente em que o piloto/equipe aparece
+            conn.executemany(
+                """
+                INSERT INTO drivers VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (driver_id) DO UPDATE SET
+                    name = excluded.name, short_name = excluded.short_name, country = excluded.country,
+                    photo = excluded.photo, last_season = excluded.last_season
+                WHERE excluded.last_season >= drivers.last_season
+                """,
+                driver_rows,
+            )
+            conn.executemany(
+                """
+                INSERT INTO teams VALUES (?, ?, ?, ?)
+                ON CONFLICT (team_id) DO UPDATE SET
+                    name = excluded.name, color = COALESCE(excluded.color, teams.color), last_season = excluded.last_season
+                WHERE excluded.last_season >= teams.last_season
+                """,
+                team_rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO seasons VALUES (?, ?, ?)", (season, content_hash, time.time()))
+
+    def driver_results(self, driver_id: str, season: int) -> List[Dict[str, Any]]:
+        """Resultados de um piloto numa temporada, em ordem de rodada (índice results_driver)."""
+        rows = self._conn().execute(
+            """
+            SELECT r.race_id, r.round, ra.name, ra.circuit, ra.date, r.team, r.position,
+                   r.grid_position, r.position_change, r.points, r.avg_lap_time
+            FROM results r
+            JOIN races ra ON ra.race_id = r.race_id
+            WHERE r.driver_id = ? AND r.season = ?
+            ORDER BY r.round
+            """,
+            (driver_id, season),
+        )
+        return [
+            {
+                "raceId": row["race_id"],
+                "round": row["round"],
+                "race": row["name"],
+                "circuit": row["circuit"],
+                "date": row["date"],
+                "team": row["team"],
+                "position": row["position"],
+                "gridPosition": row["grid_position"],
+                "positionChange": row["position_change"],
+                "points": row["points"],
+                "avgLapTime": row["avg_lap_time"],
+            }
+            for row in rows
+        ]
+
+    def team_progression(self, team_id: str, season: int) -> List[Dict[str, Any]]:
+        """
+        Pontos da equipe rodada a rodada: pontos na rodada, acumulado e posição no
+        campeonato de equipes depois dela (empate = mesma posição).
+        """
+        rows = self._conn().execute(
+            """
+            WITH rounds AS (SELECT race_id, round FROM races WHERE season = :season),
+            season_teams AS (SELECT DISTINCT team_id FROM results WHERE season = :season),
+            per_round AS (
+                SELECT team_id, round, SUM(points) AS points
+                FROM results WHERE season = :season GROUP BY team_id, round
+            ),
+            cumulative AS (
+                SELECT t.team_id, r.race_id, r.round, COALESCE(p.points, 0) AS points,
+                       SUM(COALESCE(p.points, 0)) OVER (PARTITION BY t.team_id ORDER BY r.round) AS total
+                FROM season_teams t
+                CROSS JOIN rounds r
+                LEFT JOIN per_round p ON p.team_id = t.team_id AND p.round = r.round
+            ),
+            ranked AS (
+                SELECT *, RANK() OVER (PARTITION BY round ORDER BY total DESC) AS standing FROM cumulative
+            )
+            SELECT race_id, round, points, total, standing FROM ranked
+            WHERE team_id = :team ORDER BY round
+            """,
+            {"season": season, "team": team_id},
+        )
+        return [
+            {
+                "raceId": row["race_id"],
+                "round": row["round"],
+                "points": row["points"],
+                "totalPoints": row["total"],
+                "position": row["standing"],
+            }
+            for row in rows
+        ]
+
+    def team_name(self, team_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT name, color FROM teams WHERE team_id = ?", (team_id,)).fetchone()
+        return {"name": row["name"], "color": row["color"]} if row else None
+
+    def circuit_results(
+        self,
+        circuit_id: str,
+        first: Optional[int] = None,
+        last: Optional[int] = None,
+        top: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Corridas num circuito nas temporadas indexadas entre first e last, com os N primeiros de cada."""
+        conn = self._conn()
+        races = conn.execute(
+            "SELECT * FROM races WHERE circuit_id = ? AND season BETWEEN ? AND ? ORDER BY season",
+            (circuit_id, first if first is not None else 0, last if last is not None else 9999),
+        ).fetchall()
+
+        result_query = """
+            SELECT r.position, r.driver_id, r.driver, r.team, r.grid_position,
+                   r.position_change, r.points, r.avg_lap_time
+            FROM results r
+            WHERE r.race_id = ?
+            ORDER BY r.position
+        """
+        if top is not None:
+            result_query += " LIMIT ?"
+        out = []
+        for race in races:
+            args = (race["race_id"], top) if top is not None else (race["race_id"],)
+            out.append({
+                "season": race["season"],
+                "id": race["race_id"],
+                "round": race["round"],
+                "name": race["name"],
+                "circuit": race["circuit"],
+                "country": race["country"],
+                "date": race["date"],
+                "fastestLap": race["fastest_lap"],
+                "results": [
+                    {
+                        "position": row["position"],
+                        "driverId": row["driver_id"],
+                        "driver": row["driver"],
+                        "team": row["team"],
+                        "gridPosition": row["grid_position"],
+                        "positionChange": row["position_change"],
+                        "points": row["points"],
+                        "avgLapTime": row["avg_lap_time"],
+                    }
+                    for row in conn.execute(result_query, args)
+                ],
+            })
+        return out
+
+
+results_store = ResultsStore(RESULTS_STORE_PATH)